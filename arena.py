@@ -0,0 +1,264 @@
+"""Headless engine-vs-engine matches for the Connect 4 and Othello bots.
+
+Each player is an engine spec "[engine:]key=val,...":
+
+    c4 engines:       c4                     keys: depth, time (ms), book (0/1)
+    othello engines:  man (othello_man.py),  boy (othello_boy.py)   keys: depth
+                      man also takes patterns (0/1: fitted pattern tables or hand evaluation)
+                      and probcut (cut threshold in standard deviations; selective search)
+                      mcts (othello_mcts.py)   keys: nodes (playouts), time (ms), puct (1: priors from the evaluation, 0: plain UCT)
+
+    python arena.py c4 depth=6 time=200 --games 20 --workers 4
+    python arena.py othello man:depth=5 boy:depth=3 --games 10 --out match.jsonl
+
+Games start from seeded random openings; every opening is played twice with
+the colours swapped. One JSON line is written per finished game, followed by a
+summary line with W/D/L (from A's side), games per second and an Elo estimate.
+"""
+import argparse
+import json
+import math
+import random
+import sys
+import time
+from contextlib import contextmanager
+from multiprocessing import Pool
+from typing import Dict, List, Optional, Tuple
+
+GAMES = ("c4", "othello")
+ENGINES = {"c4": ("c4",), "othello": ("man", "boy", "mcts")}
+
+def parse_spec(game: str, spec: str) -> Dict:
+    """'man:depth=5,probcut=1.5' -> {'engine': 'man', 'depth': 5, 'probcut': 1.5}."""
+    engine, sep, opts = spec.partition(":")
+    if not sep:
+        engine, opts = ("", spec) if "=" in spec else (spec, "")
+    engine = engine or ENGINES[game][0]
+    if engine not in ENGINES[game]:
+        raise ValueError(f"unknown {game} engine {engine!r}; choose from {ENGINES[game]}")
+    cfg = {"engine": engine}
+    for kv in filter(None, opts.split(",")):
+        k, v = kv.split("=")
+        cfg[k.strip()] = float(v) if "." in v else int(v)
+    return cfg
+
+# --- Engine state ---
+# The engines keep their TTs (and Connect 4 its history table) in module
+# globals. Every game gives each side fresh ones, swapped in around its moves,
+# so neither an earlier game in the worker nor the other configuration can
+# leak into a search.
+def fresh_state(game: str) -> Dict:
+    """{module: {global name: fresh value}} for one side of a game."""
+    if game == "c4":
+        import new_c4_app as c4
+        return {c4: {"TT": c4.TranspositionTable(), "HISTORY": [[0] * c4.COLS for _ in range(3)]}}
+    import othello_boy as ob
+    import othello_man as om
+    return {om: {"TT": om.TranspositionTable(), "SOLVER_TT": om.TranspositionTable(), "_tt_selective": False},
+            ob: {"TT": {}}}
+
+@contextmanager
+def engine_state(state: Dict):
+    """Install one side's state in the engine modules for the duration of its move."""
+    for module, names in state.items():
+        for name, value in names.items():
+            setattr(module, name, value)
+    try:
+        yield
+    finally:
+        for module, names in state.items():
+            for name in names:
+                names[name] = getattr(module, name)
+
+# --- Connect 4 ---
+def c4_game(a: Dict, b: Dict, opening: List[int]) -> Tuple[Optional[int], List[int], List[float]]:
+    """Play a (P1) against b (P2) after `opening`. Returns (winner 1/2/None, moves, seconds per side)."""
+    import new_c4_app as c4
+    board = c4.make_board()
+    moves = []
+    for col in opening:
+        board.play(col)
+        moves.append(col)
+    spent = [0.0, 0.0]
+    states = {c4.P1: fresh_state("c4"), c4.P2: fresh_state("c4")}
+    while c4.winner(board) is None and not c4.is_full(board):
+        p = board.to_move()
+        cfg = a if p == c4.P1 else b
+        t0 = time.perf_counter()
+        with engine_state(states[p]):
+            col = c4.best_move(board, p, depth=cfg.get("depth", 6), time_budget_ms=cfg.get("time"),
+                               use_book=bool(cfg.get("book", 1)))
+        spent[p-1] += time.perf_counter() - t0
+        board.play(col)
+        moves.append(col)
+    return c4.winner(board), moves, spent
+
+def c4_opening(rng: random.Random, plies: int) -> List[int]:
+    import new_c4_app as c4
+    while True:
+        board = c4.make_board()
+        seq = []
+        for _ in range(plies):
+            col = rng.choice(board.legal_moves())
+            if board.is_winning_move(col):
+                break
+            board.play(col)
+            seq.append(col)
+        else:
+            return seq
+
+# --- Othello ---
+# Shared state is the othello_man bitboard pair; bit r*8 + c is othello_boy's (r, c).
+_mcts: Dict = {}  # an MCTS engine (and tree) per (spec, colour), for one game
+def othello_move(cfg: Dict, black: int, white: int, player: int) -> Optional[int]:
+    if cfg["engine"] == "man":
+        import othello_man as om
+        om.use_patterns(bool(cfg.get("patterns", 1)))
+        mv = om.best_move(black, white, player, depth=cfg.get("depth", 5), probcut=cfg.get("probcut"))
+        return None if mv is None else mv.bit_length() - 1
+    if cfg["engine"] == "mcts":
+        import othello_mcts as mc
+        key = (json.dumps(cfg, sort_keys=True), player)
+        if key not in _mcts:
+            _mcts[key] = mc.MCTS(puct=bool(cfg.get("puct", 1)))
+        mv = _mcts[key].best_move(black, white, player, nodes=cfg.get("nodes"), time_ms=cfg.get("time"))
+        return None if mv is None else mv.bit_length() - 1
+    import othello_boy as ob
+    grid = [[ob.EMPTY]*ob.N for _ in range(ob.N)]
+    for i in range(64):
+        if black >> i & 1: grid[i // 8][i % 8] = ob.BLACK
+        elif white >> i & 1: grid[i // 8][i % 8] = ob.WHITE
+    mv = ob.best_move(grid, player, depth=cfg.get("depth", 5))
+    return None if mv is None else mv[0]*8 + mv[1]
+
+def othello_game(a: Dict, b: Dict, opening: List[int]) -> Tuple[Optional[int], List[int], List[float]]:
+    """Play a (Black, 1) against b (White, 2). Moves are square indices, -1 for a pass."""
+    import othello_man as om
+    black, white = om.start_position()
+    player = 1
+    moves = []
+    spent = [0.0, 0.0]
+    pending = list(opening)
+    states = {1: fresh_state("othello"), 2: fresh_state("othello")}
+    _mcts.clear()
+    while True:
+        mine, theirs = (black, white) if player == 1 else (white, black)
+        legal = om.legal_moves(mine, theirs)
+        if not legal:
+            if not om.legal_moves(theirs, mine):
+                break
+            moves.append(-1)
+            player = 3 - player
+            continue
+        if pending:
+            sq = pending.pop(0)
+        else:
+            t0 = time.perf_counter()
+            with engine_state(states[player]):
+                sq = othello_move(a if player == 1 else b, black, white, player)
+            spent[player-1] += time.perf_counter() - t0
+            if sq is None or not (legal >> sq & 1):
+                raise RuntimeError(f"engine {a if player == 1 else b} returned illegal move {sq}")
+        mine, theirs = om.apply_move(1 << sq, mine, theirs)
+        black, white = (mine, theirs) if player == 1 else (theirs, mine)
+        moves.append(sq)
+        player = 3 - player
+    nb, nw = om.popcnt(black), om.popcnt(white)
+    return (1 if nb > nw else 2 if nw > nb else None), moves, spent
+
+def othello_opening(rng: random.Random, plies: int) -> List[int]:
+    import othello_man as om
+    black, white = om.start_position()
+    player, seq = 1, []
+    for _ in range(plies):
+        mine, theirs = (black, white) if player == 1 else (white, black)
+        legal = om.legal_moves(mine, theirs)
+        if not legal:
+            break
+        squares = [i for i in range(64) if legal >> i & 1]
+        sq = rng.choice(squares)
+        mine, theirs = om.apply_move(1 << sq, mine, theirs)
+        black, white = (mine, theirs) if player == 1 else (theirs, mine)
+        seq.append(sq)
+        player = 3 - player
+    return seq
+
+PLAY = {"c4": c4_game, "othello": othello_game}
+OPENING = {"c4": c4_opening, "othello": othello_opening}
+
+def play_one(job: Dict) -> Dict:
+    """Pool task: one game from a job dict; the result is from A's side."""
+    a_first = job["a_first"]
+    first, second = (job["a"], job["b"]) if a_first else (job["b"], job["a"])
+    t0 = time.perf_counter()
+    w, moves, spent = PLAY[job["game"]](first, second, job["opening"])
+    a_side = 1 if a_first else 2
+    result = "draw" if w is None else ("win" if w == a_side else "loss")
+    return {
+        "game": job["game"], "index": job["index"], "a": job["a"], "b": job["b"],
+        "a_first": a_first, "opening": job["opening"], "moves": moves, "result": result,
+        "seconds": round(time.perf_counter() - t0, 4),
+        "a_seconds": round(spent[a_side-1], 4), "b_seconds": round(spent[2-a_side], 4),
+    }
+
+def elo(wins: int, draws: int, losses: int) -> Tuple[Optional[float], Optional[float]]:
+    """Elo difference of A over B and its ~95% margin (None when undefined)."""
+    n = wins + draws + losses
+    if n == 0:
+        return None, None
+    s = (wins + draws / 2) / n
+    if s <= 0 or s >= 1:
+        return None, None
+    diff = -400 * math.log10(1/s - 1)
+    se = math.sqrt(s * (1 - s) / n)
+    lo, hi = max(s - 1.96*se, 1e-6), min(s + 1.96*se, 1 - 1e-6)
+    margin = (-400 * math.log10(1/hi - 1) + 400 * math.log10(1/lo - 1)) / 2
+    return round(diff, 1) + 0.0, round(margin, 1)
+
+def make_jobs(game: str, a: Dict, b: Dict, games: int, opening_plies: int, seed: int) -> List[Dict]:
+    rng = random.Random(seed)
+    jobs = []
+    for i in range(games):
+        if i % 2 == 0:
+            opening = OPENING[game](rng, opening_plies)
+        jobs.append({"game": game, "index": i, "a": a, "b": b, "opening": opening, "a_first": i % 2 == 0})
+    return jobs
+
+def run_match(game: str, a: Dict, b: Dict, games: int = 20, opening_plies: int = 4, seed: int = 0,
+              workers: Optional[int] = None, out=sys.stdout) -> Dict:
+    """Play the match, writing one JSON line per game to `out`, and return the summary."""
+    jobs = make_jobs(game, a, b, games, opening_plies, seed)
+    tally = {"win": 0, "draw": 0, "loss": 0}
+    t0 = time.perf_counter()
+    with Pool(workers) as pool:
+        for rec in pool.imap_unordered(play_one, jobs):
+            tally[rec["result"]] += 1
+            out.write(json.dumps(rec) + "\n")
+            out.flush()
+    wall = time.perf_counter() - t0
+    diff, margin = elo(tally["win"], tally["draw"], tally["loss"])
+    return {"summary": True, "game": game, "a": a, "b": b, "games": games, **tally,
+            "seconds": round(wall, 3), "games_per_sec": round(games / wall, 3) if wall else None,
+            "elo": diff, "elo_margin": margin}
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("game", choices=GAMES)
+    ap.add_argument("a", help="engine spec for player A")
+    ap.add_argument("b", help="engine spec for player B")
+    ap.add_argument("--games", type=int, default=20)
+    ap.add_argument("--opening-plies", type=int, default=4)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--workers", type=int, default=None, help="pool size (default: one per core)")
+    ap.add_argument("--out", default="-", help="JSONL file, '-' for stdout")
+    args = ap.parse_args()
+    a, b = parse_spec(args.game, args.a), parse_spec(args.game, args.b)
+    out = sys.stdout if args.out == "-" else open(args.out, "w")
+    try:
+        summary = run_match(args.game, a, b, args.games, args.opening_plies, args.seed, args.workers, out)
+        out.write(json.dumps(summary) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"A {summary['win']}W {summary['draw']}D {summary['loss']}L, "
+          f"{summary['games_per_sec']} games/s, Elo {summary['elo']} ± {summary['elo_margin']}", file=sys.stderr)
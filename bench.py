@@ -0,0 +1,189 @@
+"""Fixed-position search benchmark for the three engines.
+
+Runs every engine over its bundled positions (opening, midgame, endgame),
+one search to a fixed depth each, and reports the engines' SearchStats:
+nodes, nodes/sec, time to each depth, TT hit rate and cutoff rates. The suite
+is run REPEATS times and each position's fastest run is kept. othello_boy and
+othello_man search the same Othello positions, so the list-vs-bitboard gap is
+printed as well.
+
+    python bench.py                          # print results
+    python bench.py --save bench_base.json   # record a baseline
+    python bench.py --compare bench_base.json --tolerance 0.15
+
+With --compare the exit status is 1 if any engine/position got slower or
+searched more nodes than the baseline by more than the tolerance.
+"""
+import argparse
+import json
+import sys
+from itertools import accumulate
+from typing import Dict, List
+
+import new_c4_app as c4
+import othello_boy as ob
+import othello_man as om
+from search_stats import SearchStats
+
+# Move sequences from the initial position (Connect 4 columns; Othello squares)
+POSITIONS = {
+    "c4": {
+        "opening": "3233",
+        "midgame": "32332363355566",
+        "endgame": "323323633555662252255666",
+    },
+    "othello": {
+        "opening": "e6d6c7f7",
+        "midgame": "e6d6c7f7c4d3f6f4g4f5e3c6c3h3g5h4h6g6h7f3e8g8g7e7",
+        "endgame": "e6d6c7f7c4d3f6f4g4f5e3c6c3h3g5h4h6g6h7f3e8g8g7e7b6b8c8h8a8h5d7c5g2d8f8g3b5a6a5h1",
+    },
+}
+DEPTHS = {"c4": 10, "othello_man": 6, "othello_boy": 6}
+REPEATS = 5       # runs of the suite; each position's fastest run is reported
+MIN_TIMED = 0.2   # runs faster than this (seconds) are too noisy to compare on time
+
+def c4_position(seq: str):
+    board = c4.make_board()
+    for ch in seq:
+        board.play(int(ch))
+    return board
+
+def othello_position(seq: str):
+    """(black, white, side to move) after the squares in seq, passing when needed."""
+    black, white = om.start_position()
+    player = 1
+    for i in range(0, len(seq), 2):
+        mv = om.parse_move(seq[i:i+2])
+        mine, theirs = (black, white) if player == 1 else (white, black)
+        if not om.legal_moves(mine, theirs):
+            player = 3 - player
+            mine, theirs = theirs, mine
+        mine, theirs = om.apply_move(mv, mine, theirs)
+        black, white = (mine, theirs) if player == 1 else (theirs, mine)
+        player = 3 - player
+    mine, theirs = (black, white) if player == 1 else (white, black)
+    if not om.legal_moves(mine, theirs):
+        player = 3 - player
+    return black, white, player
+
+def boy_grid(black: int, white: int):
+    grid = [[ob.EMPTY]*ob.N for _ in range(ob.N)]
+    for i in range(64):
+        if black >> i & 1: grid[i // 8][i % 8] = ob.BLACK
+        elif white >> i & 1: grid[i // 8][i % 8] = ob.WHITE
+    return grid
+
+# --- Runs ---
+def reset(engine: str):
+    """Cold engine state, so every run of a position does the same work."""
+    if engine == "c4":
+        c4.TT.clear()
+        for hist in c4.HISTORY:
+            hist[:] = [0] * c4.COLS
+    elif engine == "othello_man":
+        om.TT.clear()
+        for cached in (om.move_masks, om.side_eval, om.canonical):
+            cached.cache_clear()
+    else:
+        ob.TT.clear()
+
+def search(engine: str, pos, depth: int, stats: SearchStats):
+    if engine == "c4":
+        return c4.best_move(pos, pos.to_move(), depth, use_book=False, stats=stats)
+    black, white, player = pos
+    if engine == "othello_man":
+        return om.best_move(black, white, player, depth, stats=stats)
+    return ob.best_move(boy_grid(black, white), player, depth, stats=stats)
+
+def bench_position(engine: str, pos, max_depth: int) -> SearchStats:
+    """One search to max_depth from a cold state."""
+    reset(engine)
+    stats = SearchStats()
+    search(engine, pos, max_depth, stats)
+    return stats
+
+def summary(stats: SearchStats, max_depth: int) -> Dict:
+    """depth_times is the time to complete each depth the engine reports
+    (every iteration for othello_man, only max_depth for the others)."""
+    return {
+        "depth": max_depth,
+        "nodes": stats.nodes,
+        "seconds": round(stats.seconds, 4),
+        "nps": round(stats.nps) if stats.seconds else None,
+        "depth_times": [round(t, 4) for t in accumulate(d["seconds"] for d in stats.depths)],
+        "tt_probes": stats.tt_probes,
+        "tt_hit_rate": round(stats.tt_hit_rate, 4),
+        "cutoff_rate": round(stats.cutoff_rate, 4),
+        "first_move_cutoff_rate": round(stats.first_move_cutoff_rate, 4),
+        "ebf": round(stats.ebf, 3) if stats.ebf else None,
+    }
+
+def run_suite(depths: Dict[str, int] = DEPTHS, repeats: int = REPEATS) -> Dict[str, Dict[str, Dict]]:
+    """The whole suite `repeats` times over, keeping each position's fastest run.
+    Repeating the suite rather than each position spreads a slow spell of the
+    machine over all positions instead of spoiling every run of one."""
+    cases = []
+    for engine, depth in depths.items():
+        game = "c4" if engine == "c4" else "othello"
+        for name, seq in POSITIONS[game].items():
+            pos = c4_position(seq) if game == "c4" else othello_position(seq)
+            cases.append((engine, name, pos, depth))
+    best: Dict = {}
+    for _ in range(repeats):
+        for engine, name, pos, depth in cases:
+            stats = bench_position(engine, pos, depth)
+            if (engine, name) not in best or stats.seconds < best[engine, name].seconds:
+                best[engine, name] = stats
+    results: Dict[str, Dict[str, Dict]] = {}
+    for engine, name, _, depth in cases:
+        results.setdefault(engine, {})[name] = summary(best[engine, name], depth)
+    return results
+
+def regressions(base: Dict, cur: Dict, tolerance: float) -> List[str]:
+    out = []
+    for engine, positions in cur.items():
+        for name, r in positions.items():
+            b = base.get(engine, {}).get(name)
+            if not b or b["depth"] != r["depth"]:
+                continue
+            timed = b["seconds"] >= MIN_TIMED
+            if timed and r["nps"] < b["nps"] * (1 - tolerance):
+                out.append(f"{engine}/{name}: nps {b['nps']} -> {r['nps']}")
+            if timed and r["seconds"] > b["seconds"] * (1 + tolerance):
+                out.append(f"{engine}/{name}: time to depth {r['depth']} {b['seconds']}s -> {r['seconds']}s")
+            if r["nodes"] > b["nodes"] * (1 + tolerance):
+                out.append(f"{engine}/{name}: nodes {b['nodes']} -> {r['nodes']}")
+    return out
+
+def report(results: Dict):
+    for engine, positions in results.items():
+        for name, r in positions.items():
+            times = " ".join(f"{t:.3f}" for t in r["depth_times"])
+            print(f"{engine:12} {name:8} d{r['depth']} nodes {r['nodes']:>8} nps {r['nps']:>7} "
+                  f"tt hit {r['tt_hit_rate']:.1%} cut {r['cutoff_rate']:.1%} first {r['first_move_cutoff_rate']:.1%}  "
+                  f"time/depth {times}")
+    if "othello_man" in results and "othello_boy" in results:
+        for name in results["othello_man"]:
+            m, b = results["othello_man"][name], results["othello_boy"][name]
+            if m["depth"] == b["depth"]:
+                print(f"othello {name:8} bitboard vs list: nps x{m['nps'] / max(b['nps'], 1):.1f}, "
+                      f"time to depth {m['depth']} x{b['seconds'] / max(m['seconds'], 1e-9):.1f} faster")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--save", help="write results as a JSON baseline")
+    ap.add_argument("--compare", help="baseline JSON to check against")
+    ap.add_argument("--repeats", type=int, default=REPEATS, help="runs per position, fastest kept")
+    ap.add_argument("--tolerance", type=float, default=0.15, help="allowed relative slowdown")
+    args = ap.parse_args()
+    results = run_suite(repeats=args.repeats)
+    report(results)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=1)
+    if args.compare:
+        with open(args.compare) as f:
+            bad = regressions(json.load(f), results, args.tolerance)
+        for line in bad:
+            print("REGRESSION", line)
+        sys.exit(1 if bad else 0)
@@ -0,0 +1,50 @@
+"""Vectorized Connect 4 scoring for many positions at once.
+
+Boards are (N, 6, 7) integer arrays in the list-board layout: row 0 at the
+bottom, cells EMPTY/P1/P2. evaluate_batch and winner_batch give the same
+numbers as new_c4_app.evaluate and new_c4_app.winner.
+"""
+import numpy as np
+
+from new_c4_app import COLS, EMPTY, P1, P2, ROWS, count_window
+
+# Score of a window by its state 5*mine + theirs (the same table Board uses)
+WSCORE = np.array([count_window(k // 5, k % 5) if k // 5 + k % 5 <= 4 else 0 for k in range(25)],
+                  dtype=np.int64)
+
+def window_counts(x: np.ndarray) -> np.ndarray:
+    """Stones per window for a 0/1 (N, 6, 7) array, as (N, 69): horizontal,
+    vertical, diag up-right, diag up-left (same order as new_c4_app.WINDOWS)."""
+    n = x.shape[0]
+    h = x[:, :, 0:4] + x[:, :, 1:5] + x[:, :, 2:6] + x[:, :, 3:7]
+    v = x[:, 0:3, :] + x[:, 1:4, :] + x[:, 2:5, :] + x[:, 3:6, :]
+    d1 = x[:, 0:3, 0:4] + x[:, 1:4, 1:5] + x[:, 2:5, 2:6] + x[:, 3:6, 3:7]
+    d2 = x[:, 0:3, 3:7] + x[:, 1:4, 2:6] + x[:, 2:5, 1:5] + x[:, 3:6, 0:4]
+    return np.concatenate([h.reshape(n, 24), v.reshape(n, 21), d1.reshape(n, 12), d2.reshape(n, 12)], axis=1)
+
+def evaluate_batch(boards: np.ndarray, player) -> np.ndarray:
+    """evaluate(board, player) for every board; `player` is a scalar or one per board."""
+    boards = np.asarray(boards)
+    player = np.asarray(player).reshape(-1, 1, 1)
+    me = (boards == player).astype(np.int8)
+    opp = ((boards != EMPTY) & (boards != player)).astype(np.int8)
+    k = 5 * window_counts(me) + window_counts(opp)
+    return WSCORE[k].sum(axis=1) + 6 * me[:, :, COLS // 2].sum(axis=1, dtype=np.int64)
+
+def winner_batch(boards: np.ndarray) -> np.ndarray:
+    """winner(board) for every board: P1, P2, or 0 (EMPTY) for none."""
+    boards = np.asarray(boards)
+    out = np.full(boards.shape[0], EMPTY, dtype=np.int8)
+    # P1 is checked first, as in winner()
+    for p in (P2, P1):
+        won = (window_counts((boards == p).astype(np.int8)) == 4).any(axis=1)
+        out[won] = p
+    return out
+
+def to_grid(board) -> np.ndarray:
+    """(6, 7) array for a new_c4_app Board."""
+    return np.array([[board.cell(r, c) for c in range(COLS)] for r in range(ROWS)], dtype=np.int8)
+
+def to_array(boards) -> np.ndarray:
+    """(N, 6, 7) array for a sequence of Boards."""
+    return np.stack([to_grid(b) for b in boards]) if len(boards) else np.zeros((0, ROWS, COLS), np.int8)
@@ -0,0 +1,73 @@
+"""Offline generator for the Connect 4 opening book read by new_c4_app.OpeningBook.
+
+Searches every position reachable in up to --ply moves (no finished games,
+mirror images folded together) and writes the sorted record file:
+
+    python c4_book.py --ply 4 --depth 10 --out c4_book.bin
+"""
+import argparse
+import math
+import sys
+import time
+
+import new_c4_app as c4
+
+def positions(max_ply: int):
+    """Yield one move sequence per canonical position with at most max_ply stones,
+    oriented so the board is the canonical (smaller-key) side of its mirror pair."""
+    seen = set()
+    frontier = [[]]
+    for ply in range(max_ply + 1):
+        nxt = []
+        for seq in frontier:
+            b = c4.make_board()
+            for c in seq:
+                b.play(c)
+            key, mirrored = c4.book_key(b)
+            if key in seen:
+                continue
+            seen.add(key)
+            if mirrored:
+                seq = [c4.COLS-1-c for c in seq]
+                b = c4.make_board()
+                for c in seq:
+                    b.play(c)
+            yield seq, b
+            if ply == max_ply:
+                continue
+            for c in b.legal_moves():
+                if not b.is_winning_move(c):
+                    nxt.append(seq + [c])
+        frontier = nxt
+
+def search(board, depth: int):
+    p = board.to_move()
+    c4.TT.new_search()
+    score, move = c4.alphabeta(board, depth, -math.inf, math.inf, p, p)
+    if move is None:
+        move = board.legal_moves()[0]
+    return move, score
+
+def generate(path: str, max_ply: int, depth: int, verbose: bool = True) -> int:
+    records = []
+    t0 = time.perf_counter()
+    for seq, board in positions(max_ply):
+        move, score = search(board, depth)
+        records.append((c4.book_key(board)[0], move, score))
+        if verbose and len(records) % 100 == 0:
+            print(f"{len(records)} positions, {time.perf_counter() - t0:.0f}s", file=sys.stderr)
+    records.sort()
+    with open(path, "wb") as f:
+        f.write(c4.BOOK_HEADER.pack(c4.BOOK_MAGIC, 1, max_ply))
+        for rec in records:
+            f.write(c4.BOOK_RECORD.pack(*rec))
+    return len(records)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--ply", type=int, default=4, help="deepest position (stones on board) to include")
+    ap.add_argument("--depth", type=int, default=10, help="search depth per position")
+    ap.add_argument("--out", default=c4.BOOK_PATH)
+    args = ap.parse_args()
+    n = generate(args.out, args.ply, args.depth)
+    print(f"wrote {n} positions to {args.out}")
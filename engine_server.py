@@ -0,0 +1,446 @@
+"""Long-running engine service: the Connect 4 and Othello bots behind a line protocol.
+
+One process keeps the engines imported and a pool of worker processes whose
+transposition tables stay warm between searches, and serves any number of
+games at once, over stdin/stdout or a local TCP socket:
+
+    python engine_server.py                  # one session on stdin/stdout
+    python engine_server.py --port 7878      # 127.0.0.1:7878, a session per connection
+    python engine_server.py --workers 4      # default: one worker per core
+
+Protocol: one command per line, words separated by spaces. Every reply is one
+line starting with its name and the game id (- when there is none). Searches
+reply when they finish, so replies for different games can interleave.
+
+    new <id> c4|othello [<spec>]
+        Create a game. The engine spec is arena.py's: "c4:depth=8,book=0",
+        "man:depth=6,probcut=1.0", "boy:depth=4", ... (default: c4 / man).
+        -> ok <id>
+    position <id> startpos [moves <move> ...]
+        Set the position. Connect 4 moves are columns 0-6; Othello moves are
+        squares like d3, and forced passes may be written "pass" or left out.
+        -> ok <id>
+    go <id> [depth <n>] [time <ms>]
+        Search for the side to move; with no limits, the spec's time or depth.
+        -> bestmove <id> <move>   a column, a square, "pass", or "none" once the game is over
+    stop <id>
+        End the game's search now. It replies with the move of the deepest
+        search it finished, or of a depth 1 search (never the endgame solver)
+        if none finished.
+    stats <id>
+        -> stats <id> {...}   SearchStats of the game's last search, as JSON
+    stats
+        -> stats - {...}      server counters, as JSON
+    free <id>
+        Forget the game (stopping its search). -> ok <id>
+    quit
+        End the session; on stdin/stdout, the server.
+
+Errors reply "error <id> <message>".
+
+A game is bound to one worker when it is created (the one with the fewest
+games), so its searches keep finding their earlier TT entries. A worker runs
+one search at a time; the others wait their turn. Searches run one depth at
+a time up to the depth limit, and with a time limit until the server stops
+them at the deadline, which counts from when the worker starts the search;
+Connect 4 with a time limit uses its own iterative deepening instead. stop
+reaches a worker through a shared job id and an Event, and a thread in the
+worker calls the engines' halt().
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+import new_c4_app as c4
+import othello_boy as ob
+import othello_man as om
+from arena import parse_spec
+from search_stats import SearchStats
+
+ENGINES = {"c4": ("c4",), "othello": ("man", "boy")}
+DEPTH = {"c4": 6, "man": 5, "boy": 5}  # go without limits, when the spec has neither depth nor time
+MAX_DEPTH = 60  # how deep a search with only a time limit may go
+
+# --- Worker process ---
+_stop_event = None  # set by the server after writing the job id to stop into _stop_job
+_stop_job = None
+_current = -1       # id of the job this worker is running, -1 between jobs
+_lock = threading.Lock()
+HALTS = (c4.halt, om.halt, ob.halt)
+STOPPED = (c4.SearchTimeout, om.SearchStopped, ob.SearchStopped)
+
+def _halt_all(flag: bool):
+    for halt in HALTS:
+        halt(flag)
+
+def _watch():
+    while True:
+        _stop_event.wait()
+        _stop_event.clear()
+        with _lock:
+            if _current >= 0 and _stop_job.value == _current:
+                _halt_all(True)
+
+def _init_worker(event, stop_job):
+    global _stop_event, _stop_job
+    _stop_event, _stop_job = event, stop_job
+    threading.Thread(target=_watch, daemon=True).start()
+
+def _ping() -> int:
+    return os.getpid()
+
+def _searcher(job: Dict, stats: SearchStats) -> Callable[[int, Optional[int], bool], int]:
+    """search(depth, time_ms, exact) for the job's engine and position, returning
+    a column or a square; exact=False keeps othello_man away from its endgame
+    solver. Each call starts from a fresh board, as a stopped search can leave
+    its board mid-move."""
+    cfg, pos = job["cfg"], job["position"]
+    if job["engine"] == "c4":
+        use_book = bool(cfg.get("book", 1))
+        def search(depth, time_ms, exact=True):
+            board = c4.make_board()
+            for col in pos:
+                board.play(col)
+            return c4.best_move(board, board.to_move(), depth=depth, time_budget_ms=time_ms,
+                                use_book=use_book, stats=stats)
+        return search
+    black, white, player = pos
+    if job["engine"] == "man":
+        om.use_patterns(bool(cfg.get("patterns", 1)))
+        def search(depth, time_ms, exact=True):
+            mv = om.best_move(black, white, player, depth=depth, stats=stats, probcut=cfg.get("probcut"),
+                              endgame_empties=om.ENDGAME_EMPTIES if exact else 0)
+            return mv.bit_length() - 1
+        return search
+    def search(depth, time_ms, exact=True):
+        grid = [[ob.EMPTY]*ob.N for _ in range(ob.N)]
+        for i in range(64):
+            if black >> i & 1: grid[i // 8][i % 8] = ob.BLACK
+            elif white >> i & 1: grid[i // 8][i % 8] = ob.WHITE
+        r, c = ob.best_move(grid, player, depth=depth, stats=stats)
+        return r*8 + c
+    return search
+
+def _search(job: Dict) -> Dict:
+    """Worker task: {"move", "stopped", "stats"} for the job's position."""
+    global _current
+    with _lock:
+        _current = job["id"]
+        if _stop_job.value == job["id"]:  # stopped before it started
+            _halt_all(True)
+    stats = SearchStats()
+    search = _searcher(job, stats)
+    move, stopped = None, False
+    try:
+        if job["time"] is not None and job["engine"] == "c4":
+            move = search(job["depth"], job["time"])
+        else:
+            # One depth at a time, so a stop can answer with the deepest finished search
+            depth = min(job["depth"], job["empties"])
+            if job["engine"] == "man" and job["empties"] <= om.ENDGAME_EMPTIES:
+                depth = 1  # solved exactly at any depth
+            for d in range(1, depth + 1):
+                move = search(d, None)
+    except STOPPED:
+        stopped = True
+    with _lock:
+        _current = -1
+        _halt_all(False)
+    if move is None:
+        move = search(1, None, exact=False)  # a stop must not wait for the solver
+    return {"move": move, "stopped": stopped, "stats": stats.as_dict()}
+
+# --- Positions ---
+def c4_position(tokens: List[str]) -> List[int]:
+    """Columns of a legal move sequence that doesn't run past the end of the game."""
+    board = c4.make_board()
+    for tok in tokens:
+        if not tok.isdigit() or not board.can_play(int(tok)) or c4.winner(board) is not None:
+            raise ValueError(f"illegal move {tok}")
+        board.play(int(tok))
+    return [int(tok) for tok in tokens]
+
+def othello_position(tokens: List[str]) -> Tuple[int, int, int]:
+    """(black, white, player to move) after the moves."""
+    black, white = om.start_position()
+    player = 1
+    for tok in tokens:
+        mine, theirs = (black, white) if player == 1 else (white, black)
+        if not om.legal_moves(mine, theirs):
+            if not om.legal_moves(theirs, mine):
+                raise ValueError(f"move {tok} after the end of the game")
+            player = 3 - player  # forced pass
+            if tok == "pass":
+                continue
+            mine, theirs = theirs, mine
+        bit = om.parse_move(tok)
+        if bit is None or not bit & om.legal_moves(mine, theirs):
+            raise ValueError(f"illegal move {tok}")
+        mine, theirs = om.apply_move(bit, mine, theirs)
+        black, white = (mine, theirs) if player == 1 else (theirs, mine)
+        player = 3 - player
+    return black, white, player
+
+def square_name(sq: int) -> str:
+    return chr(sq % 8 + 97) + str(sq // 8 + 1)
+
+# --- Server ---
+class Worker:
+    """One engine process with its own TTs; searches one job at a time."""
+    def __init__(self, ctx):
+        self.event = ctx.Event()
+        self.stop_job = ctx.Value("q", -1)
+        self.pool = ProcessPoolExecutor(1, mp_context=ctx, initializer=_init_worker,
+                                        initargs=(self.event, self.stop_job))
+        self.lock = asyncio.Lock()
+        self.games = 0
+        self.busy = False
+
+    def stop(self, job_id: int):
+        self.stop_job.value = job_id
+        self.event.set()
+
+class Game:
+    def __init__(self, gid: str, kind: str, cfg: Dict, worker: Worker):
+        self.id, self.kind, self.cfg, self.worker = gid, kind, cfg, worker
+        self.position = [] if kind == "c4" else othello_position([])
+        self.job: Optional[Dict] = None  # the search in progress
+        self.stats: Optional[Dict] = None
+
+class EngineServer:
+    def __init__(self, workers: Optional[int] = None):
+        ctx = multiprocessing.get_context()
+        self.workers = [Worker(ctx) for _ in range(workers or os.cpu_count())]
+        self.sessions = 0
+        self.searches = 0
+        self.next_job = 0
+        self.started = time.time()
+
+    async def start(self):
+        """Start the worker processes now rather than on the first search."""
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(w.pool, _ping) for w in self.workers))
+
+    def shutdown(self):
+        for w in self.workers:
+            w.pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict:
+        return {"workers": len(self.workers), "sessions": self.sessions,
+                "games": sum(w.games for w in self.workers), "searches": self.searches,
+                "busy": sum(w.busy for w in self.workers), "uptime": round(time.time() - self.started, 1)}
+
+    async def search(self, game: Game, job: Dict) -> Dict:
+        worker = game.worker
+        loop = asyncio.get_running_loop()
+        async with worker.lock:
+            if job["stopped"]:
+                worker.stop_job.value = job["id"]
+            job["running"] = True
+            worker.busy = True
+            deadline = None
+            if job["time"] is not None and job["engine"] != "c4":
+                deadline = loop.call_later(job["time"] / 1000, self.stop, game)
+            try:
+                return await loop.run_in_executor(worker.pool, _search, job)
+            finally:
+                worker.busy = False
+                if deadline is not None:
+                    deadline.cancel()
+                self.searches += 1
+
+    def stop(self, game: Game):
+        job = game.job
+        if job is None or job["stopped"]:
+            return
+        job["stopped"] = True
+        if job["running"]:
+            game.worker.stop(job["id"])
+
+class Session:
+    """One client: its games and the command loop."""
+    def __init__(self, server: EngineServer, send: Callable[[str], None]):
+        self.server, self.send = server, send
+        self.games: Dict[str, Game] = {}
+        self.tasks = set()
+        self.closed = False
+
+    def reply(self, *words):
+        if not self.closed:
+            self.send(" ".join(map(str, words)))
+
+    async def run(self, readline):
+        self.server.sessions += 1
+        try:
+            while True:
+                line = await readline()
+                if not line:
+                    break
+                words = line.decode().split()
+                if not words:
+                    continue
+                if words[0] == "quit":
+                    break
+                try:
+                    self.handle(words)
+                except (ValueError, KeyError) as e:
+                    self.reply("error", words[1] if len(words) > 1 else "-", e.args[0] if e.args else e)
+        finally:
+            self.closed = True
+            self.server.sessions -= 1
+            for gid in list(self.games):
+                self.free(gid)
+
+    def handle(self, words: List[str]):
+        cmd, args = words[0], words[1:]
+        if cmd == "stats" and not args:
+            self.reply("stats", "-", json.dumps(self.server.stats()))
+            return
+        if not args:
+            raise ValueError(f"unknown command or missing game id: {' '.join(words)}")
+        gid = args[0]
+        if cmd == "new":
+            self.new(gid, args[1:])
+            return
+        if gid not in self.games:
+            raise KeyError(f"no game {gid}")
+        game = self.games[gid]
+        if cmd == "position":
+            if game.job is not None:
+                raise ValueError("searching")
+            if args[1:2] != ["startpos"] or (len(args) > 2 and args[2] != "moves"):
+                raise ValueError("position <id> startpos [moves ...]")
+            game.position = (c4_position if game.kind == "c4" else othello_position)(args[3:])
+            self.reply("ok", gid)
+        elif cmd == "go":
+            self.go(game, args[1:])
+        elif cmd == "stop":
+            self.server.stop(game)
+        elif cmd == "stats":
+            self.reply("stats", gid, json.dumps(game.stats))
+        elif cmd == "free":
+            self.free(gid)
+            self.reply("ok", gid)
+        else:
+            raise ValueError(f"unknown command {cmd}")
+
+    def new(self, gid: str, args: List[str]):
+        if gid in self.games:
+            raise ValueError(f"game {gid} exists")
+        if not args or args[0] not in ENGINES:
+            raise ValueError(f"new <id> {'|'.join(ENGINES)} [<spec>]")
+        kind = args[0]
+        cfg = parse_spec(kind, args[1] if len(args) > 1 else "")
+        if cfg["engine"] not in ENGINES[kind]:
+            raise ValueError(f"engine {cfg['engine']} isn't served; choose from {ENGINES[kind]}")
+        worker = min(self.server.workers, key=lambda w: w.games)
+        worker.games += 1
+        self.games[gid] = Game(gid, kind, cfg, worker)
+        self.reply("ok", gid)
+
+    def free(self, gid: str):
+        game = self.games.pop(gid)
+        self.server.stop(game)
+        game.worker.games -= 1
+
+    def go(self, game: Game, args: List[str]):
+        if game.job is not None:
+            raise ValueError("already searching")
+        limits = dict(zip(args[::2], args[1::2]))
+        if len(args) % 2 or set(limits) - {"depth", "time"}:
+            raise ValueError("go <id> [depth <n>] [time <ms>]")
+        depth = int(limits["depth"]) if "depth" in limits else None
+        time_ms = int(limits["time"]) if "time" in limits else None
+        if depth is None and time_ms is None:
+            depth, time_ms = game.cfg.get("depth"), game.cfg.get("time")
+            if time_ms is None:
+                depth = depth or DEPTH[game.cfg["engine"]]
+        # Positions without a choice are answered here
+        if game.kind == "c4":
+            board = c4.make_board()
+            for col in game.position:
+                board.play(col)
+            if c4.winner(board) is not None or c4.is_full(board):
+                self.reply("bestmove", game.id, "none")
+                return
+            empties = c4.CELLS - board.moves
+        else:
+            black, white, player = game.position
+            mine, theirs = (black, white) if player == 1 else (white, black)
+            if not om.legal_moves(mine, theirs):
+                self.reply("bestmove", game.id, "pass" if om.legal_moves(theirs, mine) else "none")
+                return
+            empties = om.popcnt(~(black | white) & om.ALL)
+        self.server.next_job += 1
+        game.job = {"id": self.server.next_job, "engine": game.cfg["engine"], "cfg": game.cfg,
+                    "position": game.position, "depth": depth or MAX_DEPTH, "time": time_ms,
+                    "empties": empties, "stopped": False, "running": False}
+        task = asyncio.ensure_future(self.finish(game, game.job))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def finish(self, game: Game, job: Dict):
+        try:
+            result = await self.server.search(game, job)
+        except Exception as e:  # a dead worker, or a bug in an engine
+            game.job = None
+            self.reply("error", game.id, f"search failed: {e!r}")
+            return
+        game.job = None
+        game.stats = result["stats"]
+        if self.games.get(game.id) is not game:  # freed while searching
+            return
+        move = result["move"]
+        self.reply("bestmove", game.id, move if game.kind == "c4" else square_name(move))
+
+# --- Transports ---
+async def serve_stdio(server: EngineServer):
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader()
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+    def send(line: str):
+        sys.stdout.write(line + "\n")
+        sys.stdout.flush()
+    await Session(server, send).run(reader.readline)
+
+async def serve_tcp(server: EngineServer, host: str, port: int):
+    async def client(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            await Session(server, lambda line: writer.write(line.encode() + b"\n")).run(reader.readline)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+    tcp = await asyncio.start_server(client, host, port)
+    print(f"listening on {host}:{port}", file=sys.stderr)
+    async with tcp:
+        await tcp.serve_forever()
+
+async def main(args):
+    server = EngineServer(args.workers)
+    try:
+        await server.start()
+        if args.port is None:
+            await serve_stdio(server)
+        else:
+            await serve_tcp(server, args.host, args.port)
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--workers", type=int, default=None, help="engine processes (default: one per core)")
+    ap.add_argument("--port", type=int, default=None, help="serve 127.0.0.1:PORT instead of stdin/stdout")
+    ap.add_argument("--host", default="127.0.0.1")
+    args = ap.parse_args()
+    try:
+        asyncio.run(main(args))
+    except KeyboardInterrupt:
+        pass
@@ -1,217 +1,863 @@
 import math
+import mmap
+import os
 import random
+import struct
+import time
 from collections import defaultdict
-from typing import List, Optional, Tuple
+from typing import Callable, List, Optional, Tuple
+
+from ponder import Ponderer
+from search_stats import SearchStats
 
 ROWS, COLS = 6, 7
 EMPTY, P1, P2 = 0, 1, 2
 
+# --- Bitboard layout ---
+# Column-major, one extra sentinel bit on top of every column: bit c*H1 + r is
+# (row r, col c), row 0 at the bottom. The sentinel row is never set, so the
+# shifts in alignment() cannot run a line over from one column into the next.
+H1 = ROWS + 1
+BOTTOM_MASK = tuple(1 << (c*H1) for c in range(COLS))
+TOP_MASK = tuple(1 << (ROWS-1 + c*H1) for c in range(COLS))
+COLUMN_MASK = tuple(((1 << ROWS) - 1) << (c*H1) for c in range(COLS))
+CENTER_MASK = COLUMN_MASK[COLS//2]
+BOARD_MASK = sum(COLUMN_MASK)
+BOTTOM_ALL = sum(BOTTOM_MASK)
+
+def alignment(pos: int) -> bool:
+    """True if the stones in `pos` contain four in a row."""
+    for s in (1, H1, H1-1, H1+1):  # vertical, horizontal, both diagonals
+        m = pos & (pos >> s)
+        if m & (m >> 2*s):
+            return True
+    return False
+
+def winning_squares(pos: int, mask: int) -> int:
+    """Empty cells (playable now or not) where the stones in `pos` would complete four."""
+    # vertical: only three below
+    r = (pos << 1) & (pos << 2) & (pos << 3)
+    for s in (H1, H1-1, H1+1):  # horizontal, both diagonals: gap at any of the four spots
+        p = (pos << s) & (pos << 2*s)
+        r |= p & (pos << 3*s)
+        r |= p & (pos >> s)
+        p = (pos >> s) & (pos >> 2*s)
+        r |= p & (pos << s)
+        r |= p & (pos >> 3*s)
+    return r & (BOARD_MASK ^ mask)
+
+def non_losing_cells(current: int, mask: int) -> int:
+    """Playable cells that don't hand the opponent an immediate win: a forced
+    block if they have exactly one playable threat, nothing if they have two,
+    and never the cell right under one of their threats. Assumes the side to
+    move (`current`) has no winning move itself."""
+    possible = (mask + BOTTOM_ALL) & BOARD_MASK
+    opp_win = winning_squares(current ^ mask, mask)
+    forced = possible & opp_win
+    if forced:
+        if forced & (forced - 1):
+            return 0
+        possible = forced
+    return possible & ~(opp_win >> 1)
+
+# Zobrist hashing for transposition table
+random.seed(1337)
+Z = [[[random.getrandbits(64) for _ in range(3)] for _ in range(COLS)] for _ in range(ROWS)]
+Z_SIDE = random.getrandbits(64)  # toggled on every move: P2 to move
+Z_ROOT = random.getrandbits(64)  # scores are from the root player's view; P2 roots key apart
+EMPTY_HASH = 0
+for _r in range(ROWS):
+    for _c in range(COLS):
+        EMPTY_HASH ^= Z[_r][_c][EMPTY]
+# ZMOVE[bit index][player]: the single XOR that turns a cell from empty to `player`
+# and flips the side to move. Sentinel bits have no entry.
+ZMOVE = [None] * (COLS*H1)
+for _r in range(ROWS):
+    for _c in range(COLS):
+        ZMOVE[_c*H1 + _r] = (0, Z[_r][_c][P1] ^ Z[_r][_c][EMPTY] ^ Z_SIDE,
+                             Z[_r][_c][P2] ^ Z[_r][_c][EMPTY] ^ Z_SIDE)
+ZPOV = (0, 0, Z_ROOT)
+
+def hash_board(board) -> int:
+    """Full recompute of the key the Board carries incrementally."""
+    h = 0
+    for r in range(ROWS):
+        for c in range(COLS):
+            h ^= Z[r][c][board.cell(r, c)]
+    if board.to_move() == P2:
+        h ^= Z_SIDE
+    return h
+
+class Board:
+    """Connect 4 position: `current` = stones of the side to move, `mask` = all stones.
+    P1 always moves first, so the side to move follows from `moves`.
+    `hash` is the Zobrist key (see hash_board), updated by play/undo.
+    `windows[w]` = 5*P1 stones + P2 stones in window w, and `evals[player]` the
+    running evaluate() score, both updated by play/undo (see evaluate_full)."""
+    __slots__ = ("current", "mask", "moves", "hash", "windows", "evals")
+
+    def __init__(self):
+        self.current = 0
+        self.mask = 0
+        self.moves = 0
+        self.hash = EMPTY_HASH
+        self.windows = [0] * len(WINDOWS)
+        self.evals = [0, 0, 0]
+
+    def copy(self) -> "Board":
+        b = Board()
+        b.current, b.mask, b.moves, b.hash = self.current, self.mask, self.moves, self.hash
+        b.windows, b.evals = self.windows[:], self.evals[:]
+        return b
+
+    def to_move(self) -> int:
+        return P1 if self.moves % 2 == 0 else P2
+
+    def stones(self, player: int) -> int:
+        return self.current if player == self.to_move() else self.current ^ self.mask
+
+    def can_play(self, col: int) -> bool:
+        return 0 <= col < COLS and not (self.mask & TOP_MASK[col])
+
+    def legal_moves(self) -> List[int]:
+        return [c for c in range(COLS) if not (self.mask & TOP_MASK[c])]
+
+    def play(self, col: int):
+        bit = (self.mask + BOTTOM_MASK[col]) & COLUMN_MASK[col]
+        idx = bit.bit_length() - 1
+        p = P1 if self.moves % 2 == 0 else P2
+        self.hash ^= ZMOVE[idx][p]
+        self.current ^= self.mask
+        self.mask |= bit
+        self.moves += 1
+        step, d1, d2 = WSTEP[p], WDELTA1[p], WDELTA2[p]
+        ev = self.evals
+        s1, s2 = ev[P1], ev[P2]
+        if bit & CENTER_MASK:
+            if p == P1: s1 += 6
+            else: s2 += 6
+        wc = self.windows
+        for w in CELL_WINDOWS[idx]:
+            k = wc[w]
+            s1 += d1[k]; s2 += d2[k]
+            wc[w] = k + step
+        ev[P1], ev[P2] = s1, s2
+
+    def undo(self, col: int):
+        idx = (self.mask & COLUMN_MASK[col]).bit_length() - 1
+        self.mask ^= 1 << idx
+        self.current ^= self.mask
+        self.moves -= 1
+        p = P1 if self.moves % 2 == 0 else P2
+        self.hash ^= ZMOVE[idx][p]
+        step, d1, d2 = WSTEP[p], WDELTA1[p], WDELTA2[p]
+        ev = self.evals
+        s1, s2 = ev[P1], ev[P2]
+        if (1 << idx) & CENTER_MASK:
+            if p == P1: s1 -= 6
+            else: s2 -= 6
+        wc = self.windows
+        for w in CELL_WINDOWS[idx]:
+            k = wc[w] - step
+            s1 -= d1[k]; s2 -= d2[k]
+            wc[w] = k
+        ev[P1], ev[P2] = s1, s2
+
+    def possible(self) -> int:
+        """Cells the next stone can land on, one per non-full column."""
+        return (self.mask + BOTTOM_ALL) & BOARD_MASK
+
+    def non_losing_moves(self) -> int:
+        return non_losing_cells(self.current, self.mask)
+
+    def is_winning_move(self, col: int) -> bool:
+        """Would the side to move complete four by playing `col`?"""
+        return alignment(self.current | ((self.mask + BOTTOM_MASK[col]) & COLUMN_MASK[col]))
+
+    def recompute(self):
+        """Rebuild hash, window counts and evals from current/mask/moves."""
+        self.hash = hash_board(self)
+        p1 = self.stones(P1)
+        p2 = p1 ^ self.mask
+        self.windows = [5*(p1 & w).bit_count() + (p2 & w).bit_count() for w in WINDOWS]
+        self.evals = [0, evaluate_full(self, P1), evaluate_full(self, P2)]
+
+    def cell(self, r: int, c: int) -> int:
+        bit = 1 << (c*H1 + r)
+        if not (self.mask & bit):
+            return EMPTY
+        return P1 if self.stones(P1) & bit else P2
+
 def make_board():
-    return [[EMPTY for _ in range(COLS)] for _ in range(ROWS)]
+    return Board()
+
+def board_from_bits(current: int, mask: int, moves: int) -> "Board":
+    b = Board()
+    b.current, b.mask, b.moves = current, mask, moves
+    b.recompute()
+    return b
+
+def board_from_grid(grid) -> "Board":
+    """Board from a list-of-lists (or array) grid, grid[r][c] with row 0 at the
+    bottom. The side to move follows from the stone count."""
+    p1 = p2 = 0
+    for r in range(ROWS):
+        for c in range(COLS):
+            v = grid[r][c]
+            if v == P1: p1 |= 1 << (c*H1 + r)
+            elif v == P2: p2 |= 1 << (c*H1 + r)
+    mask = p1 | p2
+    moves = mask.bit_count()
+    return board_from_bits(p1 if moves % 2 == 0 else p2, mask, moves)
 
 def print_board(board):
     for r in range(ROWS-1, -1, -1):
         row = []
         for c in range(COLS):
-            v = board[r][c]
+            v = board.cell(r, c)
             row.append("." if v == EMPTY else ("X" if v == P1 else "O"))
         print(" ".join(row))
     print("0 1 2 3 4 5 6\n")
 
 def legal_moves(board) -> List[int]:
-    return [c for c in range(COLS) if board[ROWS-1][c] == EMPTY]
+    return board.legal_moves()
 
 def play_move(board, col, player) -> bool:
     """Drop a piece in column; return True if success."""
-    if col < 0 or col >= COLS or board[ROWS-1][col] != EMPTY:
+    if not board.can_play(col) or player != board.to_move():
         return False
-    for r in range(ROWS):
-        if board[r][col] == EMPTY:
-            board[r][col] = player
-            return True
-    return False
+    board.play(col)
+    return True
 
 def undo_move(board, col):
-    for r in range(ROWS-1, -1, -1):
-        if board[r][col] != EMPTY:
-            board[r][col] = EMPTY
-            return
-
-def in_bounds(r, c):
-    return 0 <= r < ROWS and 0 <= c < COLS
-
-def check_dir(board, r, c, dr, dc, player):
-    cnt = 0
-    for _ in range(4):
-        if not in_bounds(r, c) or board[r][c] != player:
-            return False
-        r += dr; c += dc
-        cnt += 1
-    return cnt == 4
+    if board.mask & COLUMN_MASK[col]:
+        board.undo(col)
 
 def winner(board) -> Optional[int]:
-    dirs = [(1,0),(0,1),(1,1),(1,-1)]
-    for r in range(ROWS):
-        for c in range(COLS):
-            p = board[r][c]
-            if p == EMPTY: continue
-            for dr, dc in dirs:
-                if check_dir(board, r, c, dr, dc, p):
-                    return p
+    if alignment(board.stones(P1)):
+        return P1
+    if alignment(board.stones(P2)):
+        return P2
     return None
 
 def is_full(board) -> bool:
-    return all(board[ROWS-1][c] != EMPTY for c in range(COLS))
+    return board.moves == ROWS*COLS
 
 # Heuristic helpers
-def count_window(window: List[int], player: int) -> int:
-    opp = P1 if player == P2 else P2
+# Every window of four cells: horizontal, vertical, diag up-right, diag up-left
+WINDOWS = tuple(
+    sum(1 << ((c + i*dc)*H1 + r + i*dr) for i in range(4))
+    for dr, dc in ((0,1),(1,0),(1,1),(1,-1))
+    for r in range(ROWS) for c in range(COLS)
+    if 0 <= r + 3*dr < ROWS and 0 <= c + 3*dc < COLS
+)
+
+def count_window(mine: int, opp: int) -> int:
+    """Score one window holding `mine` of our stones and `opp` of theirs."""
+    empty = 4 - mine - opp
     score = 0
-    if window.count(player) == 4: score += 100000
-    elif window.count(player) == 3 and window.count(EMPTY) == 1: score += 100
-    elif window.count(player) == 2 and window.count(EMPTY) == 2: score += 10
-    if window.count(opp) == 3 and window.count(EMPTY) == 1: score -= 120  # block threats
-    if window.count(opp) == 4: score -= 100000
+    if mine == 4: score += 100000
+    elif mine == 3 and empty == 1: score += 100
+    elif mine == 2 and empty == 2: score += 10
+    if opp == 3 and empty == 1: score -= 120  # block threats
+    if opp == 4: score -= 100000
     return score
 
+# Incremental form: window state k = 5*n1 + n2. Adding a stone of player p moves
+# k by WSTEP[p] and changes P1's and P2's window score by WDELTA1[p][k], WDELTA2[p][k].
+CELL_WINDOWS = tuple(
+    tuple(w for w, wm in enumerate(WINDOWS) if wm >> i & 1) for i in range(COLS*H1)
+)
+WSTEP = (0, 5, 1)
+_WS1 = [count_window(k // 5, k % 5) if k // 5 + k % 5 <= 4 else 0 for k in range(30)]
+_WS2 = [count_window(k % 5, k // 5) if k // 5 + k % 5 <= 4 else 0 for k in range(30)]
+WDELTA1 = (None, tuple(_WS1[k+5] - _WS1[k] for k in range(25)), tuple(_WS1[k+1] - _WS1[k] for k in range(25)))
+WDELTA2 = (None, tuple(_WS2[k+5] - _WS2[k] for k in range(25)), tuple(_WS2[k+1] - _WS2[k] for k in range(25)))
+
 def evaluate(board, player: int) -> int:
-    score = 0
-    # center control
-    center_col = [board[r][COLS//2] for r in range(ROWS)]
-    score += center_col.count(player) * 6
+    return board.evals[player]
 
+def evaluate_full(board, player: int) -> int:
+    """From-scratch version of the score Board keeps in `evals`."""
+    me = board.stones(player)
+    opp = me ^ board.mask
+    # center control
+    score = (me & CENTER_MASK).bit_count() * 6
     # all windows of 4
-    # horizontal
-    for r in range(ROWS):
-        for c in range(COLS-3):
-            window = [board[r][c+i] for i in range(4)]
-            score += count_window(window, player)
-    # vertical
-    for c in range(COLS):
-        for r in range(ROWS-3):
-            window = [board[r+i][c] for i in range(4)]
-            score += count_window(window, player)
-    # diag up-right
-    for r in range(ROWS-3):
-        for c in range(COLS-3):
-            window = [board[r+i][c+i] for i in range(4)]
-            score += count_window(window, player)
-    # diag up-left
-    for r in range(ROWS-3):
-        for c in range(3, COLS):
-            window = [board[r+i][c-i] for i in range(4)]
-            score += count_window(window, player)
-
+    for w in WINDOWS:
+        score += count_window((me & w).bit_count(), (opp & w).bit_count())
     return score
 
-# Zobrist hashing for transposition table
-random.seed(1337)
-Z = [[[random.getrandbits(64) for _ in range(3)] for _ in range(COLS)] for _ in range(ROWS)]
-def hash_board(board) -> int:
-    h = 0
-    for r in range(ROWS):
-        for c in range(COLS):
-            v = board[r][c]
-            h ^= Z[r][c][v]
-    return h
+# --- Transposition table ---
+# Fixed-size and preallocated: one flat buffer of 64-bit words, two slots per
+# bucket. Slot 0 is depth-preferred, slot 1 always-replace. A slot is the pair
+# (key ^ data, data) so a probe only accepts data that was written with its key.
+# data packs | age:8 | move:4 | bound:2 | depth:8 | score+2**31:32 |.
+EXACT, LOWER, UPPER = 0, 1, 2
+NO_MOVE = 15
+TT_MB = 16
+
+class TranspositionTable:
+    SLOT_WORDS = 2
+
+    def __init__(self, mb: float = TT_MB, buf=None):
+        """`buf` lets several processes share one table (see start_workers);
+        it must hold at least nbytes(mb) bytes."""
+        self.buckets = self._buckets(mb)
+        self.buf = bytearray(self.nbytes(mb)) if buf is None else buf
+        self.words = memoryview(self.buf)[:self.nbytes(mb)].cast("Q")
+        self.age = 0
+
+    @classmethod
+    def _buckets(cls, mb: float) -> int:
+        slots = max(2, int(mb * 2**20) // (8 * cls.SLOT_WORDS))
+        return 1 << ((slots // 2).bit_length() - 1)
+
+    @classmethod
+    def nbytes(cls, mb: float) -> int:
+        return cls._buckets(mb) * 2 * cls.SLOT_WORDS * 8
+
+    def clear(self):
+        self.words[:] = memoryview(bytes(len(self.words) * 8)).cast("Q")
+        self.age = 0
+
+    def release(self):
+        """Drop the view on `buf` (required before closing shared memory)."""
+        self.words.release()
 
-TT = {}  # hash -> (depth, score)
+    def new_search(self):
+        """Start a new generation; entries from older ones lose their slot first."""
+        self.age = (self.age + 1) & 0xFF
+
+    def probe(self, key: int) -> Optional[Tuple[int, int, int, Optional[int]]]:
+        """Return (depth, score, bound, move) stored for key, or None."""
+        w = self.words
+        i = (key & (self.buckets - 1)) << 2
+        d = w[i+1]
+        if w[i] ^ d != key:
+            i += 2
+            d = w[i+1]
+            if w[i] ^ d != key:
+                return None
+        move = (d >> 42) & 0xF
+        return (d >> 32) & 0xFF, (d & 0xFFFFFFFF) - 2**31, (d >> 40) & 0x3, (None if move == NO_MOVE else move)
+
+    def store(self, key: int, depth: int, score: int, bound: int, move: Optional[int]) -> bool:
+        """Store an entry; True if it evicted a different position."""
+        w = self.words
+        i = (key & (self.buckets - 1)) << 2
+        d0 = w[i+1]
+        same = w[i] ^ d0 == key
+        if move is None:
+            move = (d0 >> 42) & 0xF if same else NO_MOVE
+        data = (self.age << 46) | (move << 42) | (bound << 40) | (depth << 32) | (score + 2**31)
+        # Keep a deeper entry from the current search in slot 0; anything else goes to slot 1
+        if same or ((d0 >> 46) & 0xFF) != self.age or depth >= ((d0 >> 32) & 0xFF):
+            w[i], w[i+1] = key ^ data, data
+            return not same and d0 != 0
+        d1 = w[i+3]
+        w[i+2], w[i+3] = key ^ data, data
+        return d1 != 0 and w[i+2] ^ d1 != key
+
+TT = TranspositionTable()  # keyed on board.hash ^ ZPOV[root player]
 
 def terminal_value(board, maximizing_player) -> Optional[int]:
-    w = winner(board)
-    if w == maximizing_player:
-        return 10**9
-    elif w is not None:
-        return -10**9
+    # Only the side that just moved can have completed four.
+    if alignment(board.current ^ board.mask):
+        return -10**9 if board.to_move() == maximizing_player else 10**9
     elif is_full(board):
         return 0
     return None
 
-def order_moves(board, player) -> List[int]:
-    # Prefer center, then adjacent columns
-    order = [3,2,4,1,5,0,6]
-    # Light lookahead: prefer immediate winning/blocking moves
-    moves = legal_moves(board)
-    scored = []
-    for c in moves:
-        play_move(board, c, player)
-        tv = winner(board)
-        undo_move(board, c)
-        s = 2 if tv == player else 0
-        # simulate opponent win to block
-        opp = P1 if player == P2 else P2
-        block_flag = 0
-        for oc in legal_moves(board):
-            play_move(board, oc, opp)
-            if winner(board) == opp:
-                block_flag = 1
-            undo_move(board, oc)
-            if block_flag: break
-        scored.append((s + block_flag, c))
-    # base on template order to break ties
-    scored.sort(key=lambda x: (-x[0], order.index(x[1]) if x[1] in order else 99))
-    return [c for _, c in scored]
+ORDER = (3,2,4,1,5,0,6)
+# History heuristic: HISTORY[player][col] grows by depth^2 whenever that column
+# causes a cutoff; halved at the start of every best_move.
+HISTORY = [[0] * COLS for _ in range(3)]
+
+def order_moves(board, player, first: Optional[int] = None) -> List[int]:
+    """Non-losing columns for the side to move: the TT move, then by history score,
+    center-first on ties. Assumes the side to move has no immediate win."""
+    cand = board.non_losing_moves()
+    hist = HISTORY[player]
+    moves = sorted((c for c in ORDER if cand & COLUMN_MASK[c]), key=lambda c: -hist[c])
+    if first in moves and moves[0] != first:
+        moves.remove(first)
+        moves.insert(0, first)
+    return moves
+
+def first_col(cells: int) -> int:
+    return ((cells & -cells).bit_length() - 1) // H1
+
+# Wall-clock limit for the running search (perf_counter seconds), polled every
+# 1024 nodes. alphabeta raises SearchTimeout past it; best_move catches it.
+# halt() stops a search from another thread (a ponder thread) the same way.
+_deadline: Optional[float] = None
+_halt = False
+_nodes = 0
+_stats: Optional[SearchStats] = None  # set by best_move(stats=...) for the duration of a search
+
+class SearchTimeout(Exception):
+    pass
+
+def halt(flag: bool = True):
+    """Make the running search raise SearchTimeout at its next check, until halt(False)."""
+    global _halt
+    _halt = flag
 
 def alphabeta(board, depth, alpha, beta, maximizing_player, current_player) -> Tuple[int, Optional[int]]:
+    global _nodes
+    _nodes += 1
+    if not (_nodes & 1023) and (_halt or _deadline is not None and time.perf_counter() >= _deadline):
+        raise SearchTimeout
     tv = terminal_value(board, maximizing_player)
     if tv is not None:
         return tv, None
     if depth == 0:
         return evaluate(board, maximizing_player), None
 
-    h = hash_board(board)
-    if h in TT:
-        d, s = TT[h]
+    # Threats first: take an immediate win; if every move lets the opponent win
+    # next turn, the position is lost without searching it.
+    possible = board.possible()
+    win = possible & winning_squares(board.current, board.mask)
+    if win:
+        return (10**9 if current_player == maximizing_player else -10**9), first_col(win)
+
+    h = board.hash ^ ZPOV[maximizing_player]
+    entry = TT.probe(h)
+    if _stats is not None:
+        _stats.tt_probes += 1
+        _stats.tt_hits += entry is not None
+    tt_move = None
+    if entry is not None:
+        d, s, bound, tt_move = entry
         if d >= depth:
-            return s, None
+            if bound == EXACT:
+                return s, tt_move
+            if bound == LOWER:
+                alpha = max(alpha, s)
+            else:
+                beta = min(beta, s)
+            if alpha >= beta:
+                return s, tt_move
+    alpha0, beta0 = alpha, beta
+
+    moves = order_moves(board, current_player, tt_move)
+    if not moves:
+        threat = possible & winning_squares(board.current ^ board.mask, board.mask)
+        return (-10**9 if current_player == maximizing_player else 10**9), first_col(threat or possible)
+    if _stats is not None:
+        _stats.interior += 1
 
     best_col = None
     if current_player == maximizing_player:
         value = -math.inf
-        for col in order_moves(board, current_player):
-            play_move(board, col, current_player)
+        for i, col in enumerate(moves):
+            board.play(col)
             score, _ = alphabeta(board, depth-1, alpha, beta, maximizing_player, P1 if current_player==P2 else P2)
-            undo_move(board, col)
+            board.undo(col)
             if score > value:
                 value, best_col = score, col
             alpha = max(alpha, value)
             if alpha >= beta:
+                HISTORY[current_player][col] += depth * depth
+                if _stats is not None:
+                    _stats.cutoffs += 1
+                    _stats.first_move_cutoffs += i == 0
                 break
     else:
         value = math.inf
-        for col in order_moves(board, current_player):
-            play_move(board, col, current_player)
+        for i, col in enumerate(moves):
+            board.play(col)
             score, _ = alphabeta(board, depth-1, alpha, beta, maximizing_player, P1 if current_player==P2 else P2)
-            undo_move(board, col)
+            board.undo(col)
             if score < value:
                 value, best_col = score, col
             beta = min(beta, value)
             if alpha >= beta:
+                HISTORY[current_player][col] += depth * depth
+                if _stats is not None:
+                    _stats.cutoffs += 1
+                    _stats.first_move_cutoffs += i == 0
                 break
 
-    TT[h] = (depth, int(value))
-    return int(value), best_col
+    value = int(value)
+    bound = UPPER if value <= alpha0 else (LOWER if value >= beta0 else EXACT)
+    evicted = TT.store(h, depth, value, bound, best_col)
+    if _stats is not None:
+        _stats.tt_stores += 1
+        _stats.tt_overwrites += evicted
+    return value, best_col
+
+# --- Opening book ---
+# Written offline by c4_book.py: an 8-byte header (magic, version, max ply) then
+# fixed-size records (key, best move, score) sorted by key. Positions and their
+# left-right mirror share one record under the smaller of their two keys
+# (current + mask, which is unique per position). The file is memory-mapped on
+# first use and binary-searched; a missing file just means no book.
+BOOK_MAGIC = b"C4BK"
+BOOK_HEADER = struct.Struct("<4sHH")
+BOOK_RECORD = struct.Struct("<Qbi")
+BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "c4_book.bin")
+
+def mirror(bb: int) -> int:
+    out = 0
+    for c in range(COLS):
+        out |= ((bb >> (c*H1)) & COLUMN_MASK[0]) << ((COLS-1-c)*H1)
+    return out
+
+def book_key(board) -> Tuple[int, bool]:
+    """Canonical key of the position and whether it is the mirrored one."""
+    k = board.current + board.mask
+    mk = mirror(board.current) + mirror(board.mask)
+    return (mk, True) if mk < k else (k, False)
+
+class OpeningBook:
+    def __init__(self, path: str = BOOK_PATH):
+        self.path = path
+        self._mm = None
+        self._loaded = False
+        self.max_ply = -1
+        self.size = 0
+
+    def _load(self):
+        self._loaded = True
+        try:
+            with open(self.path, "rb") as f:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return
+        magic, version, ply = BOOK_HEADER.unpack_from(self._mm, 0)
+        if magic != BOOK_MAGIC or version != 1:
+            self._mm = None
+            return
+        self.max_ply = ply
+        self.size = (len(self._mm) - BOOK_HEADER.size) // BOOK_RECORD.size
+
+    def lookup(self, board) -> Optional[Tuple[int, int]]:
+        """(best column, score for the side to move) if the position is in the book."""
+        if not self._loaded:
+            self._load()
+        if self._mm is None or board.moves > self.max_ply:
+            return None
+        key, mirrored = book_key(board)
+        lo, hi = 0, self.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            k, move, score = BOOK_RECORD.unpack_from(self._mm, BOOK_HEADER.size + mid*BOOK_RECORD.size)
+            if k < key:
+                lo = mid + 1
+            elif k > key:
+                hi = mid
+            else:
+                return (COLS-1-move if mirrored else move), score
+        return None
 
-def best_move(board, player, depth=6) -> int:
-    _, move = alphabeta(board, depth, -math.inf, math.inf, player, player)
+BOOK = OpeningBook()
+
+def new_search():
+    TT.new_search()
+    for hist in HISTORY:
+        hist[:] = [v >> 1 for v in hist]
+
+def best_move(board, player, depth=6, time_budget_ms: Optional[int] = None, use_book: bool = True,
+              stats: Optional[SearchStats] = None) -> int:
+    """Fixed-depth search, or with time_budget_ms, iterative deepening until the
+    deadline; the move from the deepest completed iteration is returned.
+    Book positions are answered without searching. `stats` is filled in if given."""
+    global _stats
+    if use_book and player == board.to_move():
+        hit = BOOK.lookup(board)
+        if hit is not None:
+            return hit[0]
+    new_search()
+    _stats = stats
+    n0, t0 = _nodes, time.perf_counter()
+    try:
+        if time_budget_ms is None:
+            _, move = alphabeta(board, depth, -math.inf, math.inf, player, player)
+            if stats is not None:
+                stats.add_depth(depth, _nodes - n0, time.perf_counter() - t0)
+        else:
+            move = iterative_deepening(board, player, time_budget_ms)
+    finally:
+        _stats = None
+    if stats is not None:
+        stats.nodes += _nodes - n0
+        stats.seconds += time.perf_counter() - t0
     if move is None:
         # no legal move fallback
         ms = legal_moves(board)
         return ms[0] if ms else -1
     return move
 
-def play_cli():
+def iterative_deepening(board, player, time_budget_ms: int) -> Optional[int]:
+    # Each iteration stores its principal variation in the TT, and alphabeta tries
+    # TT moves first, so the next iteration starts down the previous best line.
+    # A timed-out iteration unwinds by exception, hence the copy.
+    global _deadline
+    board = board.copy()
+    start = time.perf_counter()
+    move = None
+    try:
+        for d in range(1, ROWS*COLS - board.moves + 1):
+            if d > 1:
+                _deadline = start + time_budget_ms / 1000
+            n0, t0 = _nodes, time.perf_counter()
+            score, m = alphabeta(board, d, -math.inf, math.inf, player, player)
+            if _stats is not None:
+                _stats.add_depth(d, _nodes - n0, time.perf_counter() - t0)
+            if m is not None:
+                move = m
+            if abs(score) >= 10**9:  # forced result, deeper won't change it
+                break
+    except SearchTimeout:
+        pass
+    finally:
+        _deadline = None
+    return move
+
+# --- Parallel root search ---
+# start_workers() moves TT into shared memory and starts a process pool that
+# attaches to it. parallel_best_move() searches the first root move itself,
+# then farms the rest out with that score as alpha. A sibling scoring above it
+# is exact, and the first move in root order with the highest score wins, which
+# is what the serial search picks at the same depth. Root order depends on the
+# TT move and HISTORY, so the two agree move for move when started from the
+# same (e.g. cleared) state; otherwise they may break ties differently.
+# Only the COLS-1 siblings run in the pool, so more workers than MAX_WORKERS
+# would sit idle: the speedup is bounded by the root's branching factor and by
+# the first move being searched alone (Lazy SMP would scale further).
+MAX_WORKERS = COLS - 1
+_pool = None
+_pool_shm = None
+_pool_workers = 0
+
+def _attach_tt(name: str, mb: float):
+    # Pool initializer. Forked workers inherit the parent's view of the segment;
+    # drop it and attach by name, which also covers the spawn start method.
+    global TT, _pool_shm
+    from multiprocessing import shared_memory
+    TT.release()
+    _pool_shm = shared_memory.SharedMemory(name=name)
+    TT = TranspositionTable(mb, _pool_shm.buf)
+
+def _search_root_move(args) -> Tuple[int, int]:
+    current, mask, moves, col, depth, alpha, player, age = args
+    board = board_from_bits(current, mask, moves)
+    TT.age = age
+    board.play(col)
+    score, _ = alphabeta(board, depth-1, alpha, math.inf, player, P1 if player == P2 else P2)
+    return col, score
+
+def start_workers(workers: Optional[int] = None, mb: float = TT_MB):
+    """Start (or restart) the pool used by parallel_best_move; defaults to one
+    process per core, at most MAX_WORKERS."""
+    global TT, _pool, _pool_shm, _pool_workers
+    from multiprocessing import Pool, shared_memory
+    stop_workers()
+    _pool_shm = shared_memory.SharedMemory(create=True, size=TranspositionTable.nbytes(mb))
+    TT = TranspositionTable(mb, _pool_shm.buf)
+    _pool_workers = min(workers or os.cpu_count() or 1, MAX_WORKERS)
+    _pool = Pool(_pool_workers, initializer=_attach_tt, initargs=(_pool_shm.name, mb))
+
+def stop_workers():
+    global TT, _pool, _pool_shm
+    if _pool is not None:
+        _pool.terminate()
+        _pool.join()
+        _pool = None
+    if _pool_shm is not None:
+        TT.release()
+        TT = TranspositionTable()
+        _pool_shm.close()
+        _pool_shm.unlink()
+        _pool_shm = None
+
+def parallel_best_move(board, player, depth=6, workers: Optional[int] = None, use_book: bool = True) -> int:
+    """best_move at a fixed depth with the root moves spread over the worker pool."""
+    if use_book and player == board.to_move():
+        hit = BOOK.lookup(board)
+        if hit is not None:
+            return hit[0]
+    if _pool is None or (workers is not None and min(workers, MAX_WORKERS) != _pool_workers):
+        start_workers(workers)
+    new_search()
+    # Anything alphabeta settles at the root without recursing stays serial
+    h = board.hash ^ ZPOV[player]
+    entry = TT.probe(h)
+    moves = [] if depth < 2 or terminal_value(board, player) is not None \
+        or board.possible() & winning_squares(board.current, board.mask) \
+        or (entry is not None and entry[0] >= depth and entry[2] == EXACT) \
+        else order_moves(board, player, entry[3] if entry else None)
+    if len(moves) < 2:
+        _, move = alphabeta(board, depth, -math.inf, math.inf, player, player)
+        return move if move is not None else (legal_moves(board) or [-1])[0]
+
+    board.play(moves[0])
+    alpha, _ = alphabeta(board, depth-1, -math.inf, math.inf, player, P1 if player == P2 else P2)
+    board.undo(moves[0])
+    jobs = [(board.current, board.mask, board.moves, c, depth, alpha, player, TT.age) for c in moves[1:]]
+    scores = dict(_pool.map(_search_root_move, jobs))
+    best_col, value = moves[0], alpha
+    for c in moves[1:]:
+        if scores[c] > value:
+            best_col, value = c, scores[c]
+    TT.store(h, depth, value, EXACT, best_col)
+    return best_col
+
+# --- Exact solver ---
+# Negamax over raw (current, mask) pairs with a null-window driver. Scores are
+# from the side to move's view: (ROWS*COLS + 1 - n)//2 for a win whose winning
+# stone follows n stones on the board (earlier wins score higher), 0 for a
+# draw, the negation for a loss. current + mask is a unique position key.
+SOLVE_EMPTIES = 16  # play_cli's default for handing over to the solver
+SOLVER_TT = TranspositionTable(TT_MB)
+CELLS = ROWS*COLS
+
+def _solve_negamax(current: int, mask: int, moves: int, alpha: int, beta: int) -> int:
+    global _nodes
+    _nodes += 1
+    if _halt:
+        raise SearchTimeout
+    nxt = non_losing_cells(current, mask)
+    if not nxt:
+        return -((CELLS - moves) // 2)
+    if moves >= CELLS - 2:
+        return 0
+    lo = -((CELLS - 2 - moves) // 2)
+    if alpha < lo:
+        alpha = lo
+        if alpha >= beta:
+            return alpha
+    hi = (CELLS - 1 - moves) // 2
+    key = current + mask
+    entry = SOLVER_TT.probe(key)
+    if entry is not None:
+        _, s, bound, _ = entry
+        if bound == UPPER:
+            hi = min(hi, s)
+        elif alpha < s:
+            alpha = s
+            if alpha >= beta:
+                return alpha
+    if beta > hi:
+        beta = hi
+        if alpha >= beta:
+            return beta
+
+    # Moves that create the most new threats first, center-first on ties
+    scored = []
+    for c in ORDER:
+        bit = nxt & COLUMN_MASK[c]
+        if bit:
+            scored.append((winning_squares(current | bit, mask).bit_count(), bit))
+    scored.sort(key=lambda x: -x[0])
+
+    opp = current ^ mask
+    for _, bit in scored:
+        s = -_solve_negamax(opp, mask | bit, moves + 1, -beta, -alpha)
+        if s >= beta:
+            SOLVER_TT.store(key, 0, s, LOWER, None)
+            return s
+        if s > alpha:
+            alpha = s
+    SOLVER_TT.store(key, 0, alpha, UPPER, None)
+    return alpha
+
+def solve_score(board) -> int:
+    """Exact score of the position for the side to move (see _solve_negamax)."""
+    if board.possible() & winning_squares(board.current, board.mask):
+        return (CELLS + 1 - board.moves) // 2
+    if board.moves == CELLS:
+        return 0
+    lo = -((CELLS - board.moves) // 2)
+    hi = (CELLS + 1 - board.moves) // 2
+    while lo < hi:
+        med = lo + (hi - lo) // 2
+        if med <= 0 and int(lo / 2) < med:
+            med = int(lo / 2)
+        elif med >= 0 and int(hi / 2) > med:
+            med = int(hi / 2)
+        r = _solve_negamax(board.current, board.mask, board.moves, med, med + 1)
+        if r <= med:
+            hi = r
+        else:
+            lo = r
+    return lo
+
+def solve(board) -> Tuple[int, int]:
+    """Game-theoretic result for the side to move (1 win, 0 draw, -1 loss) and
+    the number of plies until the game ends under perfect play."""
+    if alignment(board.current ^ board.mask):
+        return -1, 0
+    s = solve_score(board)
+    if s == 0:
+        return 0, CELLS - board.moves
+    # the deciding stone follows n stones, with n of the right parity for whoever wins it
+    n = CELLS + 1 - 2*abs(s)
+    if (n - board.moves) % 2 != (0 if s > 0 else 1):
+        n -= 1
+    return (1 if s > 0 else -1), n + 1 - board.moves
+
+def solve_move(board) -> int:
+    """Best column under perfect play: quickest win, else longest defence."""
+    SOLVER_TT.new_search()
+    best, best_score = -1, None
+    for c in ORDER:
+        if not board.can_play(c):
+            continue
+        if board.is_winning_move(c):
+            return c
+        board.play(c)
+        s = -solve_score(board)
+        board.undo(c)
+        if best_score is None or s > best_score:
+            best, best_score = c, s
+    return best
+
+# --- Pondering ---
+def ponder_jobs(board, player, search: Callable[["Board"], int]) -> List[Tuple[int, Callable[[], int]]]:
+    """(column, search of the position after it) for each reply player's opponent
+    has on board that doesn't end the game, the one the TT expects first
+    (ponder.Ponderer jobs). Each search gets its own copy of the board."""
+    entry = TT.probe(board.hash ^ ZPOV[player])
+    expected = entry[3] if entry is not None else None
+    cols = sorted((c for c in ORDER if board.can_play(c)), key=lambda c: c != expected)
+    jobs = []
+    for c in cols:
+        if board.is_winning_move(c) or board.moves + 1 == CELLS:
+            continue
+        child = board.copy()
+        child.play(c)
+        jobs.append((c, lambda child=child: search(child)))
+    return jobs
+
+def play_cli(ponder: bool = True, solve_empties: int = SOLVE_EMPTIES):
+    """Human (X) against the bot. With ponder, the bot searches the replies
+    to its move while waiting for yours. From solve_empties empty cells on it
+    plays solver moves."""
     board = make_board()
     human = P1  # you are X
     ai = P2     # bot is O
     turn = P1
-    depth = 6
+    time_budget_ms = 1000
+
+    def think(b) -> int:
+        if CELLS - b.moves <= solve_empties:
+            return solve_move(b)
+        return best_move(b, ai, time_budget_ms=time_budget_ms)
+
+    ponderer = Ponderer(halt) if ponder else None
+    pondering, pondered = False, None
 
-    print("Connect 4 — you are 'X' (Player 1). Enter a column 0–6. Bot depth =", depth)
+    print(f"Connect 4 — you are 'X' (Player 1). Enter a column 0–6. Bot time = {time_budget_ms} ms")
     print_board(board)
 
     while True:
         if turn == human:
+            if ponderer is not None and not pondering:
+                ponderer.start(ponder_jobs(board, ai, think))
+                pondering = True
             try:
                 col = int(input("Your move (0–6): ").strip())
             except Exception:
@@ -220,8 +866,11 @@ def play_cli():
             if not play_move(board, col, human):
                 print("Illegal move. Try again.")
                 continue
+            if ponderer is not None:
+                pondered, pondering = ponderer.take(col), False
         else:
-            col = best_move(board, ai, depth=depth)
+            col = pondered if pondered is not None else think(board)
+            pondered = None
             play_move(board, col, ai)
             print(f"Bot plays column {col}")
 
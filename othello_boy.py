@@ -1,18 +1,56 @@
 # othello_bot.py
-import math, random, sys
-from typing import List, Tuple, Optional
+import math, random, sys, time
+from typing import Callable, List, Tuple, Optional
+
+from ponder import Ponderer
+from search_stats import SearchStats
 
 EMPTY, BLACK, WHITE = 0, 1, 2
 N = 8
 DIRS = [(-1,-1),(-1,0),(-1,1),(0,-1),(0,1),(1,-1),(1,0),(1,1)]
 
+def in_bounds(r,c): return 0 <= r < N and 0 <= c < N
+
+def neighbours(r, c):
+    return [(r+dr, c+dc) for dr,dc in DIRS if in_bounds(r+dr, c+dc)]
+
+NEIGHBOURS = [[neighbours(r, c) for c in range(N)] for r in range(N)]
+
+def rays(r, c):
+    """Squares from (r,c) to the edge in each direction, for directions with room to flip."""
+    out = []
+    for dr,dc in DIRS:
+        ray = []
+        rr, cc = r+dr, c+dc
+        while in_bounds(rr,cc):
+            ray.append((rr,cc))
+            rr += dr; cc += dc
+        if len(ray) >= 2:
+            out.append(ray)
+    return out
+
+RAYS = [[rays(r, c) for c in range(N)] for r in range(N)]
+
+def candidates(b):
+    """The empty squares next to a disc: the only places a move can be."""
+    return {(r,c) for r in range(N) for c in range(N)
+            if b[r][c]==EMPTY and any(b[rr][cc]!=EMPTY for rr,cc in NEIGHBOURS[r][c])}
+
+class Board(list):
+    """The 8x8 grid (a list of rows) plus what play_move/undo_move keep up to
+    date as they go: `cand`, candidates() of the grid, and `hash`, the Zobrist
+    hash of the grid. The move functions also take a plain list of rows, which
+    they work on without these (more slowly)."""
+    def __init__(self, rows):
+        super().__init__([list(row) for row in rows])
+        self.cand = candidates(self)
+        self.hash = hash_board(self)
+
 def new_board():
     b = [[EMPTY]*N for _ in range(N)]
     b[3][3] = WHITE; b[4][4] = WHITE
     b[3][4] = BLACK; b[4][3] = BLACK
-    return b
-
-def in_bounds(r,c): return 0 <= r < N and 0 <= c < N
+    return Board(b)
 
 def pretty(b):
     print("     a b c d e f g h")
@@ -38,16 +76,26 @@ def line_flips(b, r, c, p, dr, dc):
         return flips
     return []
 
+def flanks(b, p, opp, ray) -> bool:
+    """Would p flip anything along ray (the squares outward from its move)?"""
+    r, c = ray[0]
+    if b[r][c] != opp:
+        return False
+    for (r,c) in ray[1:]:
+        v = b[r][c]
+        if v != opp:
+            return v == p
+    return False
+
 def legal_moves(b, p) -> List[Tuple[int,int]]:
+    """Legal moves in row-major order; only the candidate squares are tried."""
+    opp = opponent(p)
     moves = []
-    for r in range(N):
-        for c in range(N):
-            if b[r][c] != EMPTY: continue
-            tot = 0
-            for dr,dc in DIRS:
-                tot += len(line_flips(b,r,c,p,dr,dc))
-            if tot > 0:
+    for (r,c) in sorted(b.cand if isinstance(b, Board) else candidates(b)):
+        for ray in RAYS[r][c]:
+            if flanks(b, p, opp, ray):
                 moves.append((r,c))
+                break
     return moves
 
 def play_move(b, r, c, p) -> List[Tuple[int,int]]:
@@ -59,6 +107,17 @@ def play_move(b, r, c, p) -> List[Tuple[int,int]]:
         for (rr,cc) in flips:
             b[rr][cc] = p
         flipped.extend(flips)
+    if not isinstance(b, Board):
+        return flipped
+    # Candidates: (r,c) is taken, its empty neighbours now touch a disc
+    b.cand.discard((r,c))
+    for (rr,cc) in NEIGHBOURS[r][c]:
+        if b[rr][cc]==EMPTY:
+            b.cand.add((rr,cc))
+    h = b.hash ^ ZPLACE[r][c][p]
+    for (rr,cc) in flipped:
+        h ^= ZFLIP[rr][cc]
+    b.hash = h
     return flipped
 
 def undo_move(b, r, c, p, flipped: List[Tuple[int,int]]):
@@ -66,6 +125,17 @@ def undo_move(b, r, c, p, flipped: List[Tuple[int,int]]):
     for (rr,cc) in flipped:
         b[rr][cc] = opp
     b[r][c] = EMPTY
+    if not isinstance(b, Board):
+        return
+    # (r,c) touched a disc when it was played; neighbours that only touched (r,c) drop out
+    b.cand.add((r,c))
+    for (rr,cc) in NEIGHBOURS[r][c]:
+        if b[rr][cc]==EMPTY and all(b[r2][c2]==EMPTY for r2,c2 in NEIGHBOURS[rr][cc]):
+            b.cand.discard((rr,cc))
+    h = b.hash ^ ZPLACE[r][c][p]
+    for (rr,cc) in flipped:
+        h ^= ZFLIP[rr][cc]
+    b.hash = h
 
 def disk_counts(b):
     black = sum(1 for r in range(N) for c in range(N) if b[r][c]==BLACK)
@@ -90,10 +160,13 @@ def frontier_count(b, p):
                     cnt += 1; break
     return cnt
 
-def evaluate(b, p) -> int:
+def evaluate(b, p, my_moves=None, opp_moves=None) -> int:
+    """Heuristic score for p. Pass the two move counts if they are already known."""
     me, you = p, opponent(p)
-    my_moves = len(legal_moves(b, me))
-    opp_moves = len(legal_moves(b, you))
+    if my_moves is None:
+        my_moves = len(legal_moves(b, me))
+    if opp_moves is None:
+        opp_moves = len(legal_moves(b, you))
     mobility = 0 if (my_moves+opp_moves)==0 else 100 * (my_moves - opp_moves) // (my_moves + opp_moves)
 
     # corners and dangerous squares
@@ -158,11 +231,34 @@ def hash_board(b):
         for c in range(N):
             h ^= Z[r][c][b[r][c]]
     return h
-TT = {}  # key -> (depth, score)
-
-def terminal_value(b, max_player) -> Optional[int]:
-    m1 = legal_moves(b, BLACK)
-    m2 = legal_moves(b, WHITE)
+# Incremental updates: placing p on an empty square, and flipping a disc
+ZPLACE = [[[Z[r][c][EMPTY] ^ Z[r][c][p] for p in range(3)] for c in range(N)] for r in range(N)]
+ZFLIP = [[Z[r][c][BLACK] ^ Z[r][c][WHITE] for c in range(N)] for r in range(N)]
+# Scores are from the root player's view and depend on who is to move, so both go in the key
+ZKEY = [[random.getrandbits(64) for _ in range(3)] for _ in range(3)]  # [cur_player][max_player]
+TT = {}  # b.hash ^ ZKEY[cur_player][max_player] -> (depth, score, best move or None)
+_stats: Optional[SearchStats] = None  # set by best_move(stats=...) for the duration of a search
+_halt = False  # set by halt(), e.g. to stop a ponder thread's search
+
+class SearchStopped(Exception):
+    pass
+
+def halt(flag=True):
+    """Make the running search raise SearchStopped at its next node, until halt(False).
+    The board it was searching is left mid-search."""
+    global _halt
+    _halt = flag
+
+def tt_store(h, depth, score, move=None):
+    if _stats is not None:
+        _stats.tt_stores += 1
+        _stats.tt_overwrites += h in TT
+    TT[h] = (depth, score, move)
+
+def terminal_value(b, max_player, m1=None, m2=None) -> Optional[int]:
+    """Final score if neither side can move. m1/m2: Black's and White's moves, if known."""
+    if m1 is None: m1 = legal_moves(b, BLACK)
+    if m2 is None: m2 = legal_moves(b, WHITE)
     if not m1 and not m2:  # game over
         black, white, _ = disk_counts(b)
         if max_player==BLACK:
@@ -183,54 +279,99 @@ def order_moves(b, moves, p):
     return sorted(moves, key=score_move, reverse=True)
 
 def alphabeta(b, depth, alpha, beta, max_player, cur_player) -> Tuple[int, Optional[Tuple[int,int]]]:
-    tv = terminal_value(b, max_player)
+    if _halt:
+        raise SearchStopped
+    if _stats is not None:
+        _stats.nodes += 1
+    # Both sides' moves, once per node: terminal test, leaf mobility, and the moves to search
+    moves_by = {BLACK: legal_moves(b, BLACK), WHITE: legal_moves(b, WHITE)}
+    tv = terminal_value(b, max_player, moves_by[BLACK], moves_by[WHITE])
     if tv is not None:
         return tv, None
     if depth == 0:
-        return evaluate(b, max_player), None
+        return evaluate(b, max_player, len(moves_by[max_player]), len(moves_by[opponent(max_player)])), None
 
-    h = hash_board(b)
+    h = b.hash ^ ZKEY[cur_player][max_player]
+    if _stats is not None:
+        _stats.tt_probes += 1
+        _stats.tt_hits += h in TT
     if h in TT:
-        d, s = TT[h]
+        d, s, m = TT[h]
         if d >= depth:
-            return s, None
+            return s, m  # the move too, so a hit at the root still has one to play
 
-    moves = legal_moves(b, cur_player)
+    moves = moves_by[cur_player]
     if not moves:
         # Pass turn
         score, _ = alphabeta(b, depth-1, alpha, beta, max_player, opponent(cur_player))
-        TT[h] = (depth, score)
+        tt_store(h, depth, score)
         return score, None
+    if _stats is not None:
+        _stats.interior += 1
 
     best_move = None
     if cur_player == max_player:
         value = -math.inf
-        for (r,c) in order_moves(b, moves, cur_player):
+        for i, (r,c) in enumerate(order_moves(b, moves, cur_player)):
             flips = play_move(b, r, c, cur_player)
             score, _ = alphabeta(b, depth-1, alpha, beta, max_player, opponent(cur_player))
             undo_move(b, r, c, cur_player, flips)
             if score > value:
                 value, best_move = score, (r,c)
             alpha = max(alpha, value)
-            if alpha >= beta: break
+            if alpha >= beta:
+                if _stats is not None:
+                    _stats.cutoffs += 1
+                    _stats.first_move_cutoffs += i == 0
+                break
     else:
         value = math.inf
-        for (r,c) in order_moves(b, moves, cur_player):
+        for i, (r,c) in enumerate(order_moves(b, moves, cur_player)):
             flips = play_move(b, r, c, cur_player)
             score, _ = alphabeta(b, depth-1, alpha, beta, max_player, opponent(cur_player))
             undo_move(b, r, c, cur_player, flips)
             if score < value:
                 value, best_move = score, (r,c)
             beta = min(beta, value)
-            if alpha >= beta: break
+            if alpha >= beta:
+                if _stats is not None:
+                    _stats.cutoffs += 1
+                    _stats.first_move_cutoffs += i == 0
+                break
 
-    TT[h] = (depth, int(value))
+    tt_store(h, depth, int(value), best_move)
     return int(value), best_move
 
-def best_move(b, player, depth=5):
-    _, mv = alphabeta(b, depth, -math.inf, math.inf, player, player)
+def best_move(b, player, depth=5, stats: Optional[SearchStats] = None):
+    global _stats
+    if not isinstance(b, Board):
+        b = Board(b)
+    _stats = stats
+    t0 = time.perf_counter()
+    n0 = stats.nodes if stats is not None else 0
+    try:
+        _, mv = alphabeta(b, depth, -math.inf, math.inf, player, player)
+    finally:
+        _stats = None
+    if stats is not None:
+        dt = time.perf_counter() - t0
+        stats.add_depth(depth, stats.nodes - n0, dt)
+        stats.seconds += dt
     return mv
 
+# --- Pondering ---
+def ponder_jobs(b, player, search) -> List[Tuple[Tuple[int,int], Callable]]:
+    """(move, search of the position after it) for each move player's opponent
+    has on b, best by order_moves first (ponder.Ponderer jobs). Each search
+    gets its own copy of the board."""
+    opp = opponent(player)
+    jobs = []
+    for r, c in order_moves(b, legal_moves(b, opp), opp):
+        child = Board(b)
+        play_move(child, r, c, opp)
+        jobs.append(((r, c), lambda child=child: search(child)))
+    return jobs
+
 # --- CLI ---
 def parse_move(s: str) -> Optional[Tuple[int,int]]:
     s = s.strip().lower()
@@ -244,12 +385,17 @@ def parse_move(s: str) -> Optional[Tuple[int,int]]:
         if 0<=r<8 and 0<=c<8: return (r,c)
     return None
 
-def game():
+def game(ponder=True):
+    """Human (Black) against the bot. With ponder, the bot searches the replies
+    to its move while waiting for yours."""
     board = new_board()
     human = BLACK  # you are Black by default
     ai = WHITE
     turn = BLACK
     depth = 5
+    ponderer = Ponderer(halt) if ponder else None
+    pondered = None
+    think = lambda b: best_move(b, ai, depth=depth)
 
     print("Othello — you are Black (●). Enter moves like d3 or '2 3'. Bot depth =", depth)
     pretty(board)
@@ -276,6 +422,8 @@ def game():
 
         if turn == human:
             print(f"Your legal moves: {[chr(c+97)+str(r+1) for (r,c) in m1]}")
+            if ponderer is not None:
+                ponderer.start(ponder_jobs(board, ai, think))
             mv = None
             while mv is None:
                 s = input("Your move: ")
@@ -283,11 +431,14 @@ def game():
                 if mv is None or mv not in m1:
                     print("Illegal/invalid. Try again.")
                     mv = None
+            if ponderer is not None:
+                pondered = ponderer.take(mv)
             r,c = mv
             flips = play_move(board, r, c, human)
             pretty(board)
         else:
-            mv = best_move(board, ai, depth=depth)
+            mv = pondered if pondered is not None else think(board)
+            pondered = None
             if mv is None:
                 print("Bot passes.")
                 turn = human
@@ -0,0 +1,109 @@
+"""Fit othello_patterns weight tables from recorded Othello games.
+
+Reads arena.py JSONL game records (lines with "game": "othello" and a "moves"
+list of squares, -1 for a pass), replays them, and regresses every position's
+final disc margin (from the side to move, both colours) on its pattern and
+mobility indices, one set of tables per stage. Self-play records come from
+the arena, e.g.
+
+    python arena.py othello man:depth=2 man:depth=2 --games 4000 --opening-plies 10 --out selfplay.jsonl
+    python othello_fit.py selfplay.jsonl --out othello_patterns.bin
+
+The fit is backfitting on the sparse one-hot features: each pass moves every
+table entry by the mean residual of the positions that use it, shrunk
+towards 0 for rarely seen entries. A tenth of the games are held out to
+report the error on unseen positions.
+"""
+import argparse
+import json
+import sys
+from typing import Iterable, List, Tuple
+
+import numpy as np
+
+import othello_man as om
+import othello_patterns as op
+
+def replay(moves: List[int]) -> Iterable[Tuple[int, int, int]]:
+    """Yield (mine, theirs, final margin for mine) for each position where someone moves."""
+    black, white = om.start_position()
+    player = 1
+    seen = []
+    for sq in moves:
+        if sq < 0:
+            player = 3 - player
+            continue
+        mine, theirs = (black, white) if player == 1 else (white, black)
+        seen.append((mine, theirs, player))
+        mine, theirs = om.apply_move(1 << sq, mine, theirs)
+        black, white = (mine, theirs) if player == 1 else (theirs, mine)
+        player = 3 - player
+    margin = om.final_diff(black, white)
+    for mine, theirs, p in seen:
+        yield mine, theirs, margin if p == 1 else -margin
+
+def load_games(paths: List[str]) -> List[List[int]]:
+    games = []
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                rec = json.loads(line)
+                if rec.get("game") == "othello" and "moves" in rec:
+                    games.append(rec["moves"])
+    return games
+
+def design(games: List[List[int]]) -> Tuple[np.ndarray, np.ndarray]:
+    """(feature indices (N, k), target (N,)), with each position taken from both sides."""
+    idx, y = [], []
+    for moves in games:
+        for mine, theirs, margin in replay(moves):
+            n_mine = om.popcnt(om.legal_moves(mine, theirs))
+            n_theirs = om.popcnt(om.legal_moves(theirs, mine))
+            idx.append(op.features(mine, theirs, n_mine, n_theirs))
+            y.append(margin)
+            idx.append(op.features(theirs, mine, n_theirs, n_mine))
+            y.append(-margin)
+    return np.array(idx, dtype=np.int64), np.array(y, dtype=np.float64)
+
+def predict(w: np.ndarray, idx: np.ndarray) -> np.ndarray:
+    return w[idx].sum(axis=1)
+
+def fit(idx: np.ndarray, y: np.ndarray, passes: int = 60, shrink: float = 100.0, verbose: bool = True) -> np.ndarray:
+    """Weights in discs (float) for the flat othello_patterns layout. Each entry
+    is tied to its mirror every pass so the evaluation stays symmetric."""
+    n = op.STAGES * op.STAGE_SIZE
+    w = np.zeros(n)
+    mirror = np.array(op.mirror_table())
+    k = idx.shape[1]
+    counts = np.bincount(idx.ravel(), minlength=n)
+    for it in range(passes):
+        r = y - predict(w, idx)
+        w += np.bincount(idx.ravel(), weights=np.repeat(r, k), minlength=n) / (k * (counts + shrink))
+        w = (w + w[mirror]) / 2
+        if verbose:
+            print(f"pass {it+1}: rmse {np.sqrt(np.mean((y - predict(w, idx))**2)):.3f}", file=sys.stderr)
+    return w
+
+def to_table(w: np.ndarray) -> np.ndarray:
+    return np.clip(np.round(w * op.SCALE), -32768, 32767).astype(np.int16)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("records", nargs="+", help="arena JSONL files")
+    ap.add_argument("--out", default=op.WEIGHTS_PATH)
+    ap.add_argument("--passes", type=int, default=60)
+    ap.add_argument("--shrink", type=float, default=100.0, help="pseudo-count pulling rare entries towards 0")
+    ap.add_argument("--holdout", type=float, default=0.1, help="fraction of games kept out of the fit")
+    args = ap.parse_args()
+    games = load_games(args.records)
+    cut = len(games) - int(len(games) * args.holdout)
+    train, test = design(games[:cut]), (design(games[cut:]) if cut < len(games) else None)
+    print(f"{cut} games, {len(train[1])} positions", file=sys.stderr)
+    w = fit(*train, passes=args.passes, shrink=args.shrink)
+    table = to_table(w)
+    if test is not None:
+        pred = predict(table.astype(np.float64) / op.SCALE, test[0])
+        print(f"held out: {len(games) - cut} games, rmse {np.sqrt(np.mean((test[1] - pred)**2)):.3f} discs "
+              f"(predicting 0: {np.sqrt(np.mean(test[1]**2)):.3f})", file=sys.stderr)
+    op.save(args.out, table)
+    print(f"wrote {args.out}")
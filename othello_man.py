@@ -1,6 +1,10 @@
 # othello_bitboard.py
-import math, sys
-from typing import Optional, Tuple, List
+import json, math, os, sys, time
+from typing import Callable, Dict, Optional, Tuple, List
+
+import othello_patterns
+from ponder import Ponderer
+from search_stats import SearchStats
 
 # --- Bitboard layout ---
 # Bit 0 = a1 (bottom-left), bit 7 = h1, bit 56 = a8, bit 63 = h8
@@ -53,23 +57,35 @@ def pretty(black:int, white:int):
 def opponent(p:int)->int:
     return 2 if p==1 else 1
 
+INNER = NOT_A & NOT_H  # opponent discs a sideways or diagonal line can pass through without wrapping
+
 def legal_moves(P:int, O:int)->int:
     """Return a bitboard of legal moves for side with stones P vs opponent O."""
     empty = ~(P | O) & ALL
     moves = 0
-    for sh in DIRS:
-        t = sh(P) & O
+    # Same fills as the DIRS shifts, inlined: masking O with INNER stops the
+    # E/W/diagonal lines at the board edge.
+    for s, o in ((8, O), (1, O & INNER), (7, O & INNER), (9, O & INNER)):
+        t = (P << s) & o
         # extend through opponent stones (max 6 steps on 8x8)
-        t |= sh(t) & O
-        t |= sh(t) & O
-        t |= sh(t) & O
-        t |= sh(t) & O
-        t |= sh(t) & O
-        moves |= sh(t) & empty
+        t |= (t << s) & o
+        t |= (t << s) & o
+        t |= (t << s) & o
+        t |= (t << s) & o
+        t |= (t << s) & o
+        moves |= (t << s) & empty
+        t = (P >> s) & o
+        t |= (t >> s) & o
+        t |= (t >> s) & o
+        t |= (t >> s) & o
+        t |= (t >> s) & o
+        t |= (t >> s) & o
+        moves |= (t >> s) & empty
     return moves
 
 def flips_in_dir(move:int, P:int, O:int, sh)->int:
-    """Compute flips in one direction for placing 'move' (single-bit) by P vs O."""
+    """Compute flips in one direction for placing 'move' (single-bit) by P vs O.
+    Step-by-step reference for move_flips(), which the search uses."""
     x = sh(move) & O
     captured = 0
     while x:
@@ -83,11 +99,46 @@ def flips_in_dir(move:int, P:int, O:int, sh)->int:
         break
     return 0
 
+# --- Flips via per-square ray masks ---
+# For each square, the squares it sees in each direction, split by whether the
+# ray runs toward higher bit indices (N, E, NE, NW) or lower (S, W, SE, SW).
+# The flips along a ray are the opponent discs before the first non-O square
+# on it, provided that square is ours: the lowest such bit on an upward ray,
+# the highest on a downward one.
+def _ray(sq:int, dr:int, dc:int)->int:
+    r, c = divmod(sq, 8)
+    ray = 0
+    r += dr; c += dc
+    while 0 <= r < 8 and 0 <= c < 8:
+        ray |= 1 << (r*8 + c)
+        r += dr; c += dc
+    return ray
+
+RAYS_UP = [tuple(ray for ray in (_ray(sq,1,0), _ray(sq,0,1), _ray(sq,1,1), _ray(sq,1,-1)) if ray)
+           for sq in range(64)]
+RAYS_DOWN = [tuple(ray for ray in (_ray(sq,-1,0), _ray(sq,0,-1), _ray(sq,-1,-1), _ray(sq,-1,1)) if ray)
+             for sq in range(64)]
+
+def move_flips(move:int, P:int, O:int)->int:
+    """Discs flipped by P playing 'move' (single-bit) against O."""
+    sq = move.bit_length() - 1
+    out = 0
+    for ray in RAYS_UP[sq]:
+        stop = ray & ~O
+        first = stop & -stop
+        if first & P:
+            out |= ray & (first - 1)
+    for ray in RAYS_DOWN[sq]:
+        stop = ray & ~O
+        if stop:
+            first = 1 << (stop.bit_length() - 1)
+            if first & P:
+                out |= ray & -(first << 1)
+    return out
+
 def apply_move(move:int, P:int, O:int) -> Tuple[int,int]:
     """Apply move (single-bit) for side P vs O. Return new (P,O). Assumes move is legal."""
-    flips = 0
-    for sh in DIRS:
-        flips |= flips_in_dir(move, P, O, sh)
+    flips = move_flips(move, P, O)
     P_new = P | move | flips
     O_new = O & ~flips
     return P_new, O_new
@@ -120,12 +171,13 @@ def frontier_count(bb:int, empties:int)->int:
     adj_empty = (N(empties)|S(empties)|E(empties)|W(empties)|NE(empties)|NW(empties)|SE(empties)|SW(empties))
     return popcnt(bb & adj_empty)
 
-def evaluate(P:int, O:int)->int:
+def evaluate(P:int, O:int, my_mask:Optional[int]=None, op_mask:Optional[int]=None)->int:
+    """Score for the side owning P. Pass the move masks if they are already known."""
     empties = ~(P|O) & ALL
 
     # Mobility
-    my_moves  = popcnt(legal_moves(P,O))
-    op_moves  = popcnt(legal_moves(O,P))
+    my_moves  = popcnt(legal_moves(P,O) if my_mask is None else my_mask)
+    op_moves  = popcnt(legal_moves(O,P) if op_mask is None else op_mask)
     mobility  = 0 if my_moves+op_moves==0 else 100 * (my_moves - op_moves) // (my_moves + op_moves)
 
     # Corners
@@ -175,102 +227,728 @@ def evaluate(P:int, O:int)->int:
 
     return corner_score + x_score + c_score + mobility + frontier + edge_score + parity
 
-# --- Alpha-beta with simple TT ---
+# --- Alpha-beta ---
 from functools import lru_cache
 
-def key_for(P:int,O:int,player:int,depth:int)->Tuple[int,int,int,int]:
-    return (P, O, player, depth)
+# Move masks and evaluations, keyed on (black, white), are shared between move
+# ordering (which scores every child) and the search of those children.
+CACHE_SIZE = 1 << 16
+
+@lru_cache(maxsize=CACHE_SIZE)
+def move_masks(B:int, W:int)->Tuple[int,int]:
+    """(Black's legal moves, White's legal moves)."""
+    return legal_moves(B, W), legal_moves(W, B)
+
+# Fitted pattern tables (othello_patterns.bin). When present they replace the
+# hand-weighted evaluate() in the search; use_patterns() switches between them.
+PATTERN_WEIGHTS = othello_patterns.load()
+PATTERNS = PATTERN_WEIGHTS  # weights side_eval uses, None for evaluate()
+# evaluate() scores all eight symmetric variants alike; pattern tables only if
+# their mirrored entries are tied (othello_fit does). tt_key() needs this.
+PATTERNS_SYMMETRIC = PATTERN_WEIGHTS is not None and othello_patterns.symmetric(PATTERN_WEIGHTS)
+SYMMETRIC_EVAL = PATTERNS is None or PATTERNS_SYMMETRIC
+
+@lru_cache(maxsize=CACHE_SIZE)
+def side_eval(B:int, W:int, side:int)->int:
+    """Static score from side's view (1=Black, 2=White): the pattern tables if
+    loaded, else evaluate()."""
+    mb, mw = move_masks(B, W)
+    if PATTERNS is not None:
+        nb, nw = popcnt(mb), popcnt(mw)
+        if side == 1:
+            return othello_patterns.evaluate(B, W, nb, nw, PATTERNS)
+        return othello_patterns.evaluate(W, B, nw, nb, PATTERNS)
+    return evaluate(B, W, mb, mw) if side == 1 else evaluate(W, B, mw, mb)
+
+def use_patterns(on:bool)->bool:
+    """Search with the pattern tables (if the file loaded) or with evaluate().
+    Returns whether patterns are in use; switching clears the TT and eval cache."""
+    global PATTERNS, SYMMETRIC_EVAL
+    w = PATTERN_WEIGHTS if on else None
+    if w is not PATTERNS:
+        PATTERNS = w
+        SYMMETRIC_EVAL = PATTERNS is None or PATTERNS_SYMMETRIC
+        side_eval.cache_clear()
+        TT.clear()
+    return PATTERNS is not None
+
+# --- Symmetry ---
+# A position and its seven rotations/reflections (D4) have the same value, so
+# the TT is keyed on one canonical variant of each, provided the evaluation
+# agrees (SYMMETRIC_EVAL); otherwise variants would share entries whose
+# heuristic scores differ. Symmetry `sym` applies
+# mirror_h if bit 0 is set, then flip_v (bit 1), then transpose (bit 2); the
+# canonical variant is the smallest (black, white) over all eight. Past the
+# opening, variants of one position almost never meet in the same search, so
+# tt_key() stops paying for canonical() after SYMMETRY_DISCS discs.
+SYMMETRY_DISCS = 16
+flip_v, mirror_h, transpose = othello_patterns.flip_v, othello_patterns.mirror_h, othello_patterns.transpose
+
+def transform(bb:int, sym:int)->int:
+    if sym & 1: bb = mirror_h(bb)
+    if sym & 2: bb = flip_v(bb)
+    if sym & 4: bb = transpose(bb)
+    return bb
+
+def untransform(bb:int, sym:int)->int:
+    """Inverse of transform(bb, sym)."""
+    if sym & 4: bb = transpose(bb)
+    if sym & 2: bb = flip_v(bb)
+    if sym & 1: bb = mirror_h(bb)
+    return bb
+
+# SYM_SQ[sym][sq]: where square sq goes under sym; UNSYM_SQ maps it back
+SYM_SQ = [[transform(1 << sq, sym).bit_length() - 1 for sq in range(64)] for sym in range(8)]
+UNSYM_SQ = [[untransform(1 << sq, sym).bit_length() - 1 for sq in range(64)] for sym in range(8)]
+
+# canonical() transforms black and white together, packed as black << 64 | white
+# (so variants compare by black, then white): the byte tricks below act on each
+# 8-byte half and the transpose masks are repeated in both.
+_T1, _T2, _T3 = ((m | m << 64) for m in (0x0F0F0F0F00000000, 0x3333000033330000, 0x5500550055005500))
+
+def _transpose128(x:int)->int:
+    t = _T1 & (x ^ (x << 28))
+    x ^= t ^ (t >> 28)
+    t = _T2 & (x ^ (x << 14))
+    x ^= t ^ (t >> 14)
+    t = _T3 & (x ^ (x << 7))
+    x ^= t ^ (t >> 7)
+    return x
+
+@lru_cache(maxsize=CACHE_SIZE)
+def canonical(B:int, W:int)->Tuple[int,int,int]:
+    """(black, white, sym) of the canonical variant, where transform(B, sym) is black."""
+    x = B << 64 | W
+    b = x.to_bytes(16, "little")
+    m = b.translate(othello_patterns.REV_BYTE)
+    xm = int.from_bytes(m, "little")
+    xv = int.from_bytes(b[7::-1] + b[15:7:-1], "little")
+    xvm = int.from_bytes(m[7::-1] + m[15:7:-1], "little")
+    vs = (x, xm, xv, xvm, _transpose128(x), _transpose128(xm), _transpose128(xv), _transpose128(xvm))
+    c = min(vs)
+    return c >> 64, c & ALL, vs.index(c)
+
+def tt_key(B:int, W:int)->Tuple[int,int,int]:
+    """(black, white, sym) to file the position under in the TT."""
+    if SYMMETRIC_EVAL and popcnt(B | W) <= SYMMETRY_DISCS:
+        return canonical(B, W)
+    return B, W, 0
+
+def canonical_move(move:Optional[int], sym:int)->Optional[int]:
+    """A move in the real orientation as a move on the canonical board."""
+    if move is None or not sym:
+        return move
+    return 1 << SYM_SQ[sym][move.bit_length() - 1]
+
+def real_move(move:Optional[int], sym:int)->Optional[int]:
+    """A move on the canonical board as a move in the real orientation."""
+    if move is None or not sym:
+        return move
+    return 1 << UNSYM_SQ[sym][move.bit_length() - 1]
+
+# --- Transposition table ---
+# Fixed-size and preallocated: one flat buffer of 64-bit words, two slots per
+# bucket. Slot 0 is depth-preferred, slot 1 always-replace. A slot is
+# (black, white, data) of the tt_key() variant, so a hit is always the same
+# position up to symmetry, and its move is stored in that orientation. data packs
+# | side:2 | age:8 | move:7 | bound:2 | depth:8 | score+2**31:32 |, where
+# side = (cur_player-1) | (max_player-1)<<1 since scores are max_player's.
+EXACT, LOWER, UPPER = 0, 1, 2
+NO_MOVE = 64
+TT_MB = 16
+
+class TranspositionTable:
+    SLOT_WORDS = 3
+
+    def __init__(self, mb: float = TT_MB):
+        self.buckets = self._buckets(mb)
+        self.words = memoryview(bytearray(self.buckets * 2 * self.SLOT_WORDS * 8)).cast("Q")
+        self.age = 0
+
+    @classmethod
+    def _buckets(cls, mb: float) -> int:
+        slots = max(2, int(mb * 2**20) // (8 * cls.SLOT_WORDS))
+        return 1 << ((slots // 2).bit_length() - 1)
+
+    def clear(self):
+        self.words[:] = memoryview(bytes(len(self.words) * 8)).cast("Q")
+        self.age = 0
+
+    def new_search(self):
+        """Start a new generation; entries from older ones lose their slot first."""
+        self.age = (self.age + 1) & 0xFF
+
+    def _index(self, B: int, W: int, side: int) -> int:
+        h = (B * 0x9E3779B97F4A7C15) ^ (W * 0xC2B2AE3D27D4EB4F) ^ (side * 0x165667B19E3779F9)
+        h ^= h >> 64
+        h ^= h >> 29
+        return (h & (self.buckets - 1)) * 2 * self.SLOT_WORDS
+
+    def probe(self, B: int, W: int, side: int) -> Optional[Tuple[int, int, int, Optional[int]]]:
+        """Return (depth, score, bound, move) stored for the position, or None."""
+        w = self.words
+        i = self._index(B, W, side)
+        d = w[i+2]
+        if w[i] != B or w[i+1] != W or d >> 57 != side:
+            i += 3
+            d = w[i+2]
+            if w[i] != B or w[i+1] != W or d >> 57 != side:
+                return None
+        move = (d >> 42) & 0x7F
+        return (d >> 32) & 0xFF, (d & 0xFFFFFFFF) - 2**31, (d >> 40) & 0x3, (None if move == NO_MOVE else 1 << move)
+
+    def store(self, B: int, W: int, side: int, depth: int, score: int, bound: int, move: Optional[int]) -> bool:
+        """Store an entry (move is a single-bit mask or None); True if it evicted a different position."""
+        w = self.words
+        i = self._index(B, W, side)
+        d0 = w[i+2]
+        same = w[i] == B and w[i+1] == W and d0 >> 57 == side and d0 != 0
+        if move is None:
+            sq = (d0 >> 42) & 0x7F if same else NO_MOVE
+        else:
+            sq = move.bit_length() - 1
+        data = (side << 57) | (self.age << 49) | (sq << 42) | (bound << 40) | (depth << 32) | (score + 2**31)
+        # Keep a deeper entry from the current search in slot 0; anything else goes to slot 1
+        if same or ((d0 >> 49) & 0xFF) != self.age or depth >= ((d0 >> 32) & 0xFF):
+            w[i], w[i+1], w[i+2] = B, W, data
+            return not same and d0 != 0
+        d1 = w[i+5]
+        evicted = d1 != 0 and not (w[i+3] == B and w[i+4] == W and d1 >> 57 == side)
+        w[i+3], w[i+4], w[i+5] = B, W, data
+        return evicted
+
+TT = TranspositionTable()  # persists across moves; game() clears it once per game
+_stats: Optional[SearchStats] = None  # set by best_move(stats=...) for the duration of a search
+_halt = False  # set by halt(), e.g. to stop a ponder thread's search
+
+class SearchStopped(Exception):
+    pass
+
+def halt(flag:bool=True):
+    """Make the running search raise SearchStopped at its next node, until halt(False)."""
+    global _halt
+    _halt = flag
+
+def tt_store(key:Tuple[int,int,int], side:int, depth:int, score:int, bound:int, move:Optional[int]):
+    """Store under key = tt_key(black, white); move is in the real orientation."""
+    cb, cw, sym = key
+    evicted = TT.store(cb, cw, side, depth, score, bound, canonical_move(move, sym))
+    if _stats is not None:
+        _stats.tt_stores += 1
+        _stats.tt_overwrites += evicted
+
+# --- ProbCut ---
+# Selective search: at depth d a shallow search to PROBCUT[d] predicts the deep
+# score as a*v + b with residual deviation sigma. If the prediction clears
+# beta (or misses alpha) by probcut*sigma, the node is cut without the deep
+# search. The regressions are fitted per evaluation by othello_probcut.py and
+# stored in othello_probcut.json as {"patterns"|"evaluate": {d: [shallow, a, b, sigma]}}.
+PROBCUT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "othello_probcut.json")
+
+def load_probcut(path:str=PROBCUT_PATH)->Dict[str, Dict[int, Tuple[int,float,float,float]]]:
+    """Calibration per evaluation name; empty if the file is missing."""
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except OSError:
+        return {}
+    return {name: {int(d): tuple(v) for d, v in pairs.items()} for name, pairs in data.items()}
+
+PROBCUT = load_probcut()
+_probcut: Optional[Dict[int, Tuple[int,float,float,float]]] = None  # {d: (shallow, a, b, margin)} during a selective search
+_tt_selective = False  # whether the TT holds results of a selective search
+
+def eval_name()->str:
+    """Key of the current evaluation in PROBCUT."""
+    return "patterns" if PATTERNS is not None else "evaluate"
+
+def probcut_cut(P:int, O:int, depth:int, alpha:int, beta:int, max_player:int, cur_player:int)->Optional[int]:
+    """alpha or beta if the shallow search says the node falls outside the window, else None."""
+    shallow, a, b, margin = _probcut[depth]
+    bound = math.ceil((beta + margin - b) / a)
+    if alphabeta(P, O, shallow, bound-1, bound, max_player, cur_player)[0] >= bound:
+        return beta
+    bound = math.floor((alpha - margin - b) / a)
+    if alphabeta(P, O, shallow, bound, bound+1, max_player, cur_player)[0] <= bound:
+        return alpha
+    return None
 
-TT = {}  # dict[(P,O,player,depth)] = score
+def ordered_children(P:int, O:int, moves_mask:int, cur_player:int)->List[Tuple[int,int,int]]:
+    """cur_player's moves as (move, black, white): corners first, then by 1-ply eval."""
+    children: List[Tuple[int,int,int]] = []
+    mm = moves_mask
+    while mm:
+        m = mm & -mm
+        mm ^= m
+        if cur_player==1:
+            P2, O2 = apply_move(m, P, O)
+        else:
+            O2, P2 = apply_move(m, O, P)
+        children.append((m, P2, O2))
+    corners = [ch for ch in children if ch[0] & CORNER]
+    non_corners = [ch for ch in children if not (ch[0] & CORNER)]
+
+    def one_ply_score(ch:Tuple[int,int,int])->int:
+        return side_eval(ch[1], ch[2], cur_player)
+
+    non_corners.sort(key=one_ply_score, reverse=True)
+    return corners + non_corners
 
 def alphabeta(P:int, O:int, depth:int, alpha:int, beta:int, max_player:int, cur_player:int)->Tuple[int, Optional[int]]:
+    """Negamax with principal variation search over (P, O) = (black, white).
+    Scores are from cur_player's view. Leaves are still scored from max_player's
+    view and negated (evaluate() is not exactly antisymmetric), so values match
+    a minimax from max_player's side."""
+    if _halt:
+        raise SearchStopped
+    if _stats is not None:
+        _stats.nodes += 1
     # Terminal: no moves for both sides
-    my_moves_mask = legal_moves(P,O)
-    op_moves_mask = legal_moves(O,P)
+    my_moves_mask, op_moves_mask = move_masks(P, O)
     if (my_moves_mask==0 and op_moves_mask==0):
-        # game over -> exact disc diff for max_player
-        my = popcnt(P) if max_player==1 else popcnt(O)
-        op = popcnt(O) if max_player==1 else popcnt(P)
-        return (10**7 if my>op else (-10**7 if op>my else 0)), None
+        # game over -> won/lost/drawn for cur_player
+        diff = popcnt(P) - popcnt(O) if cur_player==1 else popcnt(O) - popcnt(P)
+        return (10**7 if diff > 0 else (-10**7 if diff < 0 else 0)), None
     if depth == 0:
-        return evaluate(P,O) if max_player==1 else evaluate(O,P), None
-
-    k = key_for(P,O,cur_player,depth)
-    if k in TT:
-        return TT[k], None
+        score = side_eval(P, O, max_player)
+        return (score if cur_player == max_player else -score), None
+
+    side = (cur_player-1) | (max_player-1) << 1
+    key = tt_key(P, O)
+    entry = TT.probe(key[0], key[1], side)
+    if _stats is not None:
+        _stats.tt_probes += 1
+        _stats.tt_hits += entry is not None
+    tt_move = None
+    if entry is not None:
+        d, s, bound, tt_move = entry
+        tt_move = real_move(tt_move, key[2])
+        if d >= depth:
+            if bound == EXACT:
+                return s, tt_move
+            if bound == LOWER:
+                alpha = max(alpha, s)
+            else:
+                beta = min(beta, s)
+            if alpha >= beta:
+                return s, tt_move
+    if _probcut is not None and depth in _probcut and alpha > -math.inf and beta < math.inf:
+        cut = probcut_cut(P, O, depth, alpha, beta, max_player, cur_player)
+        if cut is not None:
+            return cut, None
+    alpha0 = alpha
+    other = opponent(cur_player)
 
     # If current player has no moves, pass
-    if cur_player==1:
-        moves_mask = my_moves_mask
-        PP, OO = P, O
-    else:
-        moves_mask = op_moves_mask
-        PP, OO = O, P
+    moves_mask = my_moves_mask if cur_player==1 else op_moves_mask
 
     if moves_mask == 0:
-        score, _ = alphabeta(P, O, depth-1, alpha, beta, max_player, opponent(cur_player))
-        TT[k] = score
+        score = -alphabeta(P, O, depth-1, -beta, -alpha, max_player, other)[0]
+        bound = UPPER if score <= alpha0 else (LOWER if score >= beta else EXACT)
+        tt_store(key, side, depth, score, bound, None)
         return score, None
 
-    # Move ordering: corners first, then 1-ply eval
-    ordered: List[int] = []
-    mm = moves_mask
+    # Move ordering: TT move, then corners, then 1-ply eval
+    ordered = ordered_children(P, O, moves_mask, cur_player)
+    if tt_move is not None and tt_move & moves_mask and ordered[0][0] != tt_move:
+        ordered.sort(key=lambda ch: ch[0] != tt_move)
+    if _stats is not None:
+        _stats.interior += 1
+
+    # The first move gets the full window; the rest are only checked against
+    # alpha with a null window and re-searched if one turns out better.
+    value, best_move = -math.inf, None
+    for i, (m, P2, O2) in enumerate(ordered):
+        if i == 0:
+            sc = -alphabeta(P2, O2, depth-1, -beta, -alpha, max_player, other)[0]
+        else:
+            sc = -alphabeta(P2, O2, depth-1, -alpha-1, -alpha, max_player, other)[0]
+            if alpha < sc < beta:
+                sc = -alphabeta(P2, O2, depth-1, -beta, -sc, max_player, other)[0]
+        if sc > value:
+            value, best_move = sc, m
+            if sc > alpha:
+                alpha = sc
+                if alpha >= beta:
+                    if _stats is not None:
+                        _stats.cutoffs += 1
+                        _stats.first_move_cutoffs += i == 0
+                    break
+
+    bound = UPPER if value <= alpha0 else (LOWER if value >= beta else EXACT)
+    tt_store(key, side, depth, value, bound, best_move)
+    return value, best_move
+
+def search_root(P:int, O:int, depth:int, alpha:float, beta:float, player:int,
+                children:List[Tuple[int,int,int]])->Tuple[int, Optional[int]]:
+    """PVS over the root moves, `children` in ordered_children() order. The TT
+    move is searched first, but an equal score goes to the move earliest in
+    `children`, which is the move a full-window search in that order returns."""
+    if _stats is not None:
+        _stats.nodes += 1
+        _stats.interior += 1
+    side = (player-1) | (player-1) << 1
+    key = tt_key(P, O)
+    entry = TT.probe(key[0], key[1], side)
+    tt_move = real_move(entry[3], key[2]) if entry is not None else None
+    order = list(range(len(children)))
+    for i, ch in enumerate(children):
+        if ch[0] == tt_move:
+            order.insert(0, order.pop(i))
+    alpha0 = alpha
+    other = opponent(player)
+    value, best = -math.inf, None
+    for i in order:
+        m, P2, O2 = children[i]
+        if best is None:
+            sc = -alphabeta(P2, O2, depth-1, -beta, -alpha, player, other)[0]
+        else:
+            # Null window just below alpha for moves that would win a tie
+            a = alpha - 1 if i < best else alpha
+            sc = -alphabeta(P2, O2, depth-1, -a-1, -a, player, other)[0]
+            if a < sc < beta:
+                sc = -alphabeta(P2, O2, depth-1, -beta, -a, player, other)[0]
+        if sc > value or (sc == value and i < best):
+            value, best = sc, i
+            if sc > alpha:
+                alpha = sc
+                if alpha >= beta:
+                    break
+    bound = UPPER if value <= alpha0 else (LOWER if value >= beta else EXACT)
+    tt_store(key, side, depth, value, bound, children[best][0])
+    return value, children[best][0]
+
+# --- Endgame solver ---
+# Exact negamax over the final disc differential (empties go to the winner),
+# from the side to move's view. best_move hands over to it once at most
+# ENDGAME_EMPTIES squares are empty. Moves are ordered fastest-first (fewest
+# opponent replies), odd-parity quadrants first, and searched with null
+# windows after the first. The last SMALL_EMPTIES empties skip move generation,
+# ordering and the TT: they just try each empty square in parity order, with
+# the last four unrolled (_solve4 .. _solve1). At 12 empties a solve takes about
+# 0.1 s (0.25 s at worst) on engine-played positions; at 14 it was 0.45 s on
+# average and up to 2 s, too slow to hand over to.
+ENDGAME_EMPTIES = 12
+SMALL_EMPTIES = 5
+SOLVER_TT_EMPTIES = 6  # probe the TT only where the subtree is big enough to pay for it
+SOLVER_TT = TranspositionTable(TT_MB)
+QUADRANTS = (0x000000000F0F0F0F, 0x00000000F0F0F0F0, 0x0F0F0F0F00000000, 0xF0F0F0F000000000)
+
+def final_diff(P:int, O:int)->int:
+    p, o = popcnt(P), popcnt(O)
+    e = 64 - p - o
+    return p - o + e if p > o else (p - o - e if p < o else 0)
+
+def parity_order(empties:int)->List[int]:
+    """Empty squares as single bits, those in quadrants with an odd number of empties first."""
+    odd, even = [], []
+    for q in QUADRANTS:
+        e = empties & q
+        out = odd if popcnt(e) & 1 else even
+        while e:
+            m = e & -e
+            e ^= m
+            out.append(m)
+    return odd + even
+
+def _solve1(P:int, O:int, m:int)->int:
+    f = move_flips(m, P, O)
+    if f:
+        return 2 * (popcnt(P) + popcnt(f) + 1) - 64
+    f = move_flips(m, O, P)
+    if f:
+        return 64 - 2 * (popcnt(O) + popcnt(f) + 1)
+    return final_diff(P, O)
+
+def _solve2(P:int, O:int, alpha:int, beta:int, x1:int, x2:int)->int:
+    if _stats is not None:
+        _stats.nodes += 1
+    best = -65
+    f = move_flips(x1, P, O)
+    if f:
+        best = -_solve1(O & ~f, P | x1 | f, x2)
+        if best >= beta:
+            return best
+    f = move_flips(x2, P, O)
+    if f:
+        v = -_solve1(O & ~f, P | x2 | f, x1)
+        if v > best:
+            best = v
+    if best == -65:
+        if move_flips(x1, O, P) or move_flips(x2, O, P):
+            return -_solve2(O, P, -beta, -alpha, x1, x2)
+        return final_diff(P, O)
+    return best
+
+def _solve3(P:int, O:int, alpha:int, beta:int, x1:int, x2:int, x3:int)->int:
+    if _stats is not None:
+        _stats.nodes += 1
+    best = -65
+    for m, a, b in ((x1, x2, x3), (x2, x1, x3), (x3, x1, x2)):
+        f = move_flips(m, P, O)
+        if not f:
+            continue
+        v = -_solve2(O & ~f, P | m | f, -beta, -alpha, a, b)
+        if v > best:
+            best = v
+            if v > alpha:
+                alpha = v
+                if v >= beta:
+                    return v
+    if best == -65:
+        if move_flips(x1, O, P) or move_flips(x2, O, P) or move_flips(x3, O, P):
+            return -_solve3(O, P, -beta, -alpha, x1, x2, x3)
+        return final_diff(P, O)
+    return best
+
+def _solve4(P:int, O:int, alpha:int, beta:int, x1:int, x2:int, x3:int, x4:int)->int:
+    if _stats is not None:
+        _stats.nodes += 1
+    best = -65
+    for m, a, b, c in ((x1, x2, x3, x4), (x2, x1, x3, x4), (x3, x1, x2, x4), (x4, x1, x2, x3)):
+        f = move_flips(m, P, O)
+        if not f:
+            continue
+        v = -_solve3(O & ~f, P | m | f, -beta, -alpha, a, b, c)
+        if v > best:
+            best = v
+            if v > alpha:
+                alpha = v
+                if v >= beta:
+                    return v
+    if best == -65:
+        if move_flips(x1, O, P) or move_flips(x2, O, P) or move_flips(x3, O, P) or move_flips(x4, O, P):
+            return -_solve4(O, P, -beta, -alpha, x1, x2, x3, x4)
+        return final_diff(P, O)
+    return best
+
+def _solve_small(P:int, O:int, alpha:int, beta:int, squares:List[int])->int:
+    """Last few empties; `squares` are the empty squares in the order to try them."""
+    n = len(squares)
+    if n <= 4:
+        if n == 4:
+            return _solve4(P, O, alpha, beta, *squares)
+        if n == 3:
+            return _solve3(P, O, alpha, beta, *squares)
+        if n == 2:
+            return _solve2(P, O, alpha, beta, *squares)
+        return _solve1(P, O, squares[0]) if n else final_diff(P, O)
+    if _stats is not None:
+        _stats.nodes += 1
+    best = -65
+    for m in squares:
+        f = move_flips(m, P, O)
+        if not f:
+            continue
+        v = -_solve_small(O & ~f, P | m | f, -beta, -alpha, [s for s in squares if s != m])
+        if v > best:
+            best = v
+            if v > alpha:
+                alpha = v
+                if v >= beta:
+                    break
+    if best == -65:
+        # P passes; if O can't move either the game is over
+        for m in squares:
+            if move_flips(m, O, P):
+                return -_solve_small(O, P, -beta, -alpha, squares)
+        return final_diff(P, O)
+    return best
+
+def _endgame_children(P:int, O:int, moves:int, empties:int, first:Optional[int]=None)->List[Tuple[int,int,int,int]]:
+    """(move, P after, O after, O's replies): `first`, then fewest replies, odd quadrants on ties."""
+    keyed = []
+    mm = moves
     while mm:
         m = mm & -mm
         mm ^= m
-        ordered.append(m)
-    corners = [m for m in ordered if m & CORNER]
-    non_corners = [m for m in ordered if not (m & CORNER)]
-
-    def one_ply_score(move:int)->int:
-        p_after, o_after = apply_move(move, PP, OO)
-        return evaluate(p_after, o_after)
-
-    non_corners.sort(key=one_ply_score, reverse=True)
-    ordered = corners + non_corners
-
-    best_move = None
-    if cur_player == max_player:
-        value = -math.inf
-        for m in ordered:
-            if cur_player==1:
-                P2, O2 = apply_move(m, P, O)
+        f = move_flips(m, P, O)
+        P2, O2 = P | m | f, O & ~f
+        replies = legal_moves(O2, P2)
+        quad = next(q for q in QUADRANTS if m & q)
+        keyed.append((m != first, popcnt(replies), not popcnt(empties & quad) & 1, m, P2, O2, replies))
+    keyed.sort()
+    return [k[3:] for k in keyed]
+
+def _solve(P:int, O:int, alpha:int, beta:int, empties:int, n:int, moves:int)->int:
+    """`moves` is legal_moves(P, O), which the parent already has."""
+    if n <= SMALL_EMPTIES:
+        return _solve_small(P, O, alpha, beta, parity_order(empties))
+    if _halt:
+        raise SearchStopped
+    if _stats is not None:
+        _stats.nodes += 1
+    if not moves:
+        replies = legal_moves(O, P)
+        if not replies:
+            return final_diff(P, O)
+        return -_solve(O, P, -beta, -alpha, empties, n, replies)
+
+    tt_move = None
+    if n >= SOLVER_TT_EMPTIES:
+        entry = SOLVER_TT.probe(P, O, 0)
+        if entry is not None:
+            _, s, bound, tt_move = entry
+            if bound == EXACT:
+                return s
+            if bound == LOWER:
+                alpha = max(alpha, s)
             else:
-                # play as the "current" perspective then swap back
-                o2, p2 = apply_move(m, O, P)
-                P2, O2 = p2, o2
-            sc, _ = alphabeta(P2, O2, depth-1, alpha, beta, max_player, opponent(cur_player))
-            if sc > value:
-                value, best_move = sc, m
-            alpha = max(alpha, value)
-            if alpha >= beta: break
-    else:
-        value = math.inf
-        for m in ordered:
-            if cur_player==1:
-                P2, O2 = apply_move(m, P, O)
-            else:
-                o2, p2 = apply_move(m, O, P)
-                P2, O2 = p2, o2
-            sc, _ = alphabeta(P2, O2, depth-1, alpha, beta, max_player, opponent(cur_player))
-            if sc < value:
-                value, best_move = sc, m
-            beta = min(beta, value)
-            if alpha >= beta: break
-
-    TT[k] = int(value)
-    return int(value), best_move
-
-def best_move(P:int, O:int, player:int, depth:int=5)->Optional[int]:
-    TT.clear()
-    score, move = alphabeta(P, O, depth, -math.inf, math.inf, player, player)
+                beta = min(beta, s)
+            if alpha >= beta:
+                return s
+    alpha0 = alpha
+
+    best, best_m = -65, None
+    for m, P2, O2, replies in _endgame_children(P, O, moves, empties, tt_move):
+        if best_m is None:
+            v = -_solve(O2, P2, -beta, -alpha, empties ^ m, n-1, replies)
+        else:
+            v = -_solve(O2, P2, -alpha-1, -alpha, empties ^ m, n-1, replies)
+            if alpha < v < beta:
+                v = -_solve(O2, P2, -beta, -v, empties ^ m, n-1, replies)
+        if v > best:
+            best, best_m = v, m
+            if v > alpha:
+                alpha = v
+                if v >= beta:
+                    break
+    if n >= SOLVER_TT_EMPTIES:
+        bound = UPPER if best <= alpha0 else (LOWER if best >= beta else EXACT)
+        SOLVER_TT.store(P, O, 0, n, best, bound, best_m)
+    return best
+
+def solve(P:int, O:int)->int:
+    """Exact final disc differential for the side to move with stones P against O."""
+    empties = ~(P | O) & ALL
+    return _solve(P, O, -64, 64, empties, popcnt(empties), legal_moves(P, O))
+
+def solve_move(P:int, O:int)->Tuple[int, Optional[int]]:
+    """(exact differential, best move) for the side with stones P; move is None if it must pass."""
+    empties = ~(P | O) & ALL
+    n = popcnt(empties)
+    moves = legal_moves(P, O)
+    if not moves:
+        return solve(P, O), None
+    SOLVER_TT.new_search()
+    alpha, best_m = -65, None
+    for m, P2, O2, replies in _endgame_children(P, O, moves, empties):
+        if best_m is None:
+            v = -_solve(O2, P2, -64, 64, empties ^ m, n-1, replies)
+        else:
+            v = -_solve(O2, P2, -alpha-1, -alpha, empties ^ m, n-1, replies)
+            if v > alpha:
+                v = -_solve(O2, P2, -64, -v, empties ^ m, n-1, replies)
+        if v > alpha:
+            alpha, best_m = v, m
+    return alpha, best_m
+
+# --- Iterative deepening ---
+# Each iteration after the first searches a window of ASPIRATION around the
+# previous score and widens the failing side to infinity if the result falls
+# outside it. The TT carries the previous iteration's best moves into the next.
+ASPIRATION = 128  # 4 discs with the pattern tables (1/SCALE discs)
+
+def iterative_deepening(P:int, O:int, player:int, depth:int)->Tuple[Optional[int], Optional[int]]:
+    """(score, move) for player on (P, O) = (black, white) after searching depths 1..depth."""
+    moves_mask = move_masks(P, O)[player-1]
+    if not moves_mask:
+        return None, None
+    children = ordered_children(P, O, moves_mask, player)
+    score, move = None, None
+    for d in range(1, depth+1):
+        n0, t0 = (_stats.nodes if _stats is not None else 0), time.perf_counter()
+        if score is None:
+            score, move = search_root(P, O, d, -math.inf, math.inf, player, children)
+        else:
+            lo, hi = score - ASPIRATION, score + ASPIRATION
+            while True:
+                score, move = search_root(P, O, d, lo, hi, player, children)
+                if score <= lo:
+                    lo = -math.inf
+                elif score >= hi:
+                    hi = math.inf
+                else:
+                    break
+        if _stats is not None:
+            _stats.add_depth(d, _stats.nodes - n0, time.perf_counter() - t0)
+        if abs(score) >= 10**7:  # forced result, deeper won't change it
+            break
+    return score, move
+
+def best_move(P:int, O:int, player:int, depth:int=5, stats:Optional[SearchStats]=None,
+              endgame_empties:int=ENDGAME_EMPTIES, probcut:Optional[float]=None)->Optional[int]:
+    """Best move for player on (P, O) = (black, white): iterative deepening to
+    depth, or the exact endgame solver once at most endgame_empties squares are empty.
+    With probcut (a cut threshold in standard deviations, e.g. 1.5) the search
+    is selective where othello_probcut.json has a calibration for the evaluation."""
+    global _stats, _probcut, _tt_selective
+    table = PROBCUT.get(eval_name()) if probcut is not None else None
+    selective = bool(table)
+    if selective != _tt_selective:
+        TT.clear()  # selective and full-width scores don't mix
+        _tt_selective = selective
+    TT.new_search()
+    _stats = stats
+    if selective:
+        # Depths past the deepest calibration reuse it at the same depth gap
+        top = max(table)
+        sh, a, b, sigma = table[top]
+        _probcut = {d: (d - top + sh, a, b, probcut * sigma) for d in range(top + 1, depth)}
+        _probcut.update((d, (sh, a, b, probcut * sigma)) for d, (sh, a, b, sigma) in table.items())
+    t0 = time.perf_counter()
+    n0 = stats.nodes if stats is not None else 0
+    try:
+        if popcnt(~(P | O) & ALL) <= endgame_empties:
+            mine, theirs = (P, O) if player == 1 else (O, P)
+            score, move = solve_move(mine, theirs)
+            if stats is not None:
+                stats.add_depth(depth, stats.nodes - n0, time.perf_counter() - t0)
+        else:
+            score, move = iterative_deepening(P, O, player, depth)
+    finally:
+        _stats = None
+        _probcut = None
+    if stats is not None:
+        stats.seconds += time.perf_counter() - t0
     return move
 
+# --- Pondering ---
+def ponder_jobs(B:int, W:int, player:int,
+                search:Callable[[int,int],Optional[int]])->List[Tuple[int, Callable[[], Optional[int]]]]:
+    """(move, search of the position after it) for each move player's opponent
+    has on (B, W) = (black, white), the reply player's last search expects
+    first (ponder.Ponderer jobs)."""
+    opp = 3 - player
+    mine, theirs = (B, W) if opp == 1 else (W, B)
+    moves = legal_moves(mine, theirs)
+    key = tt_key(B, W)
+    entry = TT.probe(key[0], key[1], (opp-1) | (player-1) << 1)
+    expected = real_move(entry[3], key[2]) if entry is not None else None
+    order = [] if expected is None or not expected & moves else [expected]
+    while moves:
+        m = moves & -moves
+        moves ^= m
+        if m != expected:
+            order.append(m)
+    jobs = []
+    for m in order:
+        P2, O2 = apply_move(m, mine, theirs)
+        b, w = (P2, O2) if opp == 1 else (O2, P2)
+        jobs.append((m, lambda b=b, w=w: search(b, w)))
+    return jobs
+
 # --- CLI game loop ---
-def game():
+def game(ponder:bool=True):
+    """Human (Black) against the bot. With ponder, the bot searches the replies
+    to its move while waiting for yours."""
     black, white = start_position()
+    TT.clear()
     player = 1  # 1=Black (●), 2=White (○)
-    depth = 7
+    depth = 8
+    probcut = 1.0  # selective: about the cost of a full-width depth 7
+    ponderer = Ponderer(halt) if ponder else None
+    think = lambda b, w: best_move(b, w, player=2, depth=depth, probcut=probcut)
 
     print("Othello (Bitboard) — you are Black (●). Enter moves like d3 or '2 3'. Bot depth =", depth)
     pretty(black, white)
@@ -287,9 +965,12 @@ def game():
             break
 
         # Human (Black)
+        pondered = None
         if my_moves:
             lm = list_moves(my_moves)
             print(f"Your legal moves: {lm}")
+            if ponderer is not None:
+                ponderer.start(ponder_jobs(black, white, 2, think))
             mv = None
             while mv is None:
                 s = input("Your move: ")
@@ -298,6 +979,8 @@ def game():
                     print("Illegal/invalid. Try again.")
                 else:
                     mv = bit
+            if ponderer is not None:
+                pondered = ponderer.take(mv)
             black, white = apply_move(mv, black, white)
             pretty(black, white)
         else:
@@ -306,7 +989,7 @@ def game():
         # Bot (White)
         op_moves = legal_moves(white, black)
         if op_moves:
-            mv = best_move(white, black, player=2, depth=depth)
+            mv = pondered if pondered is not None else think(black, white)
             # safety fallback
             if mv is None or (mv & op_moves) == 0:
                 # pick first legal
@@ -0,0 +1,256 @@
+"""Monte Carlo tree search for Othello on othello_man's bitboards.
+
+An anytime alternative to othello_man.best_move: each iteration walks down the
+tree by UCT (or PUCT with priors from the static evaluation), expands a leaf
+on its second visit, plays one uniformly random game to the end with
+legal_moves/apply_move, and backs the result up the path. The search stops
+at a playout budget or a deadline, and the most visited root move is played.
+
+Nodes live in parallel arrays rather than one object each (43 bytes a node),
+and the tree is kept between calls: when the next position is a child or
+grandchild of the last root, that subtree is copied out compactly and the
+search continues in it.
+
+    move = best_move(black, white, player, nodes=5000)
+    move = best_move(black, white, player, time_ms=500, puct=False)  # plain UCT
+    engine = MCTS(puct=True, seed=1)  # a tree of its own
+    move = engine.best_move(black, white, player, time_ms=500)
+"""
+import math
+import random
+import time
+from array import array
+from typing import Dict, Optional, Tuple
+
+import othello_man as om
+from search_stats import SearchStats
+
+PASS = 64
+UCT_C = 1.4        # exploration constant for UCB1 on rewards in [0, 1]
+PUCT_C = 2.0
+PRIOR_TEMPERATURE = 64  # softmax temperature over side_eval scores for PUCT priors
+MAX_NODES = 1 << 22
+NODES = 2000       # playouts per move when no budget is given
+
+class SearchTree:
+    """Node i is the position (black[i], white[i]) with player[i] to move,
+    reached by move[i] (a square, or PASS). Its children are the contiguous
+    block first[i] .. first[i] + count[i] - 1; first[i] is -1 until the node is
+    expanded, and an expanded node without children is a finished game.
+    wins[i] is the reward summed over visits[i] playouts, for the player who
+    made move[i]."""
+
+    def __init__(self, black: int, white: int, player: int):
+        self.black = array("Q", [black])
+        self.white = array("Q", [white])
+        self.player = array("b", [player])
+        self.move = array("b", [PASS])
+        self.parent = array("i", [-1])
+        self.first = array("i", [-1])
+        self.count = array("B", [0])
+        self.visits = array("I", [0])
+        self.wins = array("d", [0.0])
+        self.prior = array("f", [1.0])
+
+    def __len__(self) -> int:
+        return len(self.black)
+
+    def add(self, black: int, white: int, player: int, move: int, parent: int, prior: float):
+        self.black.append(black)
+        self.white.append(white)
+        self.player.append(player)
+        self.move.append(move)
+        self.parent.append(parent)
+        self.first.append(-1)
+        self.count.append(0)
+        self.visits.append(0)
+        self.wins.append(0.0)
+        self.prior.append(prior)
+
+    def expand(self, i: int, puct: bool):
+        """Create i's children: one per legal move, a single PASS child, or none at the end."""
+        B, W, p = self.black[i], self.white[i], self.player[i]
+        mine, theirs = (B, W) if p == 1 else (W, B)
+        moves = om.legal_moves(mine, theirs)
+        self.first[i] = len(self)
+        if not moves:
+            if om.legal_moves(theirs, mine):
+                self.add(B, W, 3 - p, PASS, i, 1.0)
+                self.count[i] = 1
+            return
+        children = []
+        while moves:
+            m = moves & -moves
+            moves ^= m
+            P2, O2 = om.apply_move(m, mine, theirs)
+            children.append((m.bit_length() - 1,) + ((P2, O2) if p == 1 else (O2, P2)))
+        if puct:
+            scores = [om.side_eval(b, w, p) / PRIOR_TEMPERATURE for _, b, w in children]
+            top = max(scores)
+            weights = [math.exp(s - top) for s in scores]
+            total = sum(weights)
+            priors = [w / total for w in weights]
+        else:
+            priors = [1.0] * len(children)
+        for (sq, b, w), pr in zip(children, priors):
+            self.add(b, w, 3 - p, sq, i, pr)
+        self.count[i] = len(children)
+
+    def select(self, i: int, puct: bool, c: float) -> int:
+        """The child of i to descend into."""
+        first, n = self.first[i], self.count[i]
+        visits, wins = self.visits, self.wins
+        if puct:
+            explore = c * math.sqrt(visits[i])
+            fpu = 1 - wins[i] / visits[i] if visits[i] else 0.5  # unvisited children start at the parent's value
+            prior = self.prior
+            best, best_score = first, -1.0
+            for j in range(first, first + n):
+                v = visits[j]
+                score = (wins[j] / v if v else fpu) + explore * prior[j] / (1 + v)
+                if score > best_score:
+                    best, best_score = j, score
+            return best
+        log_n = math.log(visits[i]) if visits[i] > 1 else 0.0
+        best, best_score = first, -1.0
+        for j in range(first, first + n):
+            v = visits[j]
+            if not v:
+                return j
+            score = wins[j] / v + c * math.sqrt(log_n / v)
+            if score > best_score:
+                best, best_score = j, score
+        return best
+
+    def find(self, black: int, white: int, player: int) -> Optional[int]:
+        """The root, a child or a grandchild of it holding this position."""
+        level = [0]
+        for _ in range(3):
+            nxt = []
+            for i in level:
+                if self.black[i] == black and self.white[i] == white and self.player[i] == player:
+                    return i
+                if self.first[i] >= 0:
+                    nxt.extend(range(self.first[i], self.first[i] + self.count[i]))
+            level = nxt
+        return None
+
+    def subtree(self, i: int) -> "SearchTree":
+        """A compact copy of the subtree under i, with i as node 0."""
+        t = SearchTree(self.black[i], self.white[i], self.player[i])
+        t.visits[0], t.wins[0] = self.visits[i], self.wins[i]
+        queue, head = [i], 0
+        while head < len(queue):
+            src, dst = queue[head], head
+            head += 1
+            first, n = self.first[src], self.count[src]
+            if first < 0:
+                continue
+            t.first[dst], t.count[dst] = len(t), n
+            for j in range(first, first + n):
+                t.add(self.black[j], self.white[j], self.player[j], self.move[j], dst, self.prior[j])
+                t.visits[-1], t.wins[-1] = self.visits[j], self.wins[j]
+                queue.append(j)
+        return t
+
+def playout(black: int, white: int, player: int, rng: random.Random) -> int:
+    """Final disc difference for Black after uniformly random play from the position."""
+    mine, theirs = (black, white) if player == 1 else (white, black)
+    legal_moves, apply_move = om.legal_moves, om.apply_move
+    randrange = rng.randrange
+    passed = False
+    while True:
+        moves = legal_moves(mine, theirs)
+        if moves:
+            for _ in range(randrange(moves.bit_count())):
+                moves &= moves - 1
+            mine, theirs = apply_move(moves & -moves, mine, theirs)
+            passed = False
+        elif passed:
+            break
+        else:
+            passed = True
+        mine, theirs = theirs, mine
+        player = 3 - player
+    diff = mine.bit_count() - theirs.bit_count()
+    return diff if player == 1 else -diff
+
+def search(tree: SearchTree, nodes: Optional[int], deadline: Optional[float], puct: bool, c: float,
+           rng: random.Random) -> int:
+    """Run playouts from the root (node 0) until the budget runs out; returns how many."""
+    parent, first, count, visits, wins = tree.parent, tree.first, tree.count, tree.visits, tree.wins
+    done = 0
+    while True:
+        i = 0
+        while first[i] >= 0 and count[i]:
+            i = tree.select(i, puct, c)
+        if first[i] < 0 and (visits[i] or i == 0) and len(tree) < MAX_NODES:
+            tree.expand(i, puct)
+            if count[i]:
+                i = tree.select(i, puct, c)
+        diff = playout(tree.black[i], tree.white[i], tree.player[i], rng)
+        # Reward for the player who moved into i, flipped at every level up
+        reward = 0.5 if diff == 0 else float((diff > 0) == (tree.player[i] == 2))
+        while True:
+            visits[i] += 1
+            wins[i] += reward
+            if i == 0:
+                break
+            reward = 1.0 - reward
+            i = parent[i]
+        done += 1
+        # At least one playout, so the root is expanded; the clock is read every 32
+        if nodes is not None and done >= nodes:
+            break
+        if deadline is not None and (done & 31) == 1 and time.perf_counter() >= deadline:
+            break
+    return done
+
+class MCTS:
+    """One player's search: its settings, random stream and the tree it keeps
+    between moves. Give every player its own, or they continue each other's trees."""
+
+    def __init__(self, puct: bool = True, c: Optional[float] = None, seed: Optional[int] = None):
+        self.puct = puct
+        self.c = (PUCT_C if puct else UCT_C) if c is None else c
+        self.tree: Optional[SearchTree] = None
+        self.rng = random.Random(seed)
+
+    def best_move(self, P: int, O: int, player: int, nodes: Optional[int] = None, time_ms: Optional[int] = None,
+                  stats: Optional[SearchStats] = None) -> Optional[int]:
+        """Most visited move (a single-bit mask, like othello_man.best_move) for
+        player on (P, O) = (black, white), or None if player must pass. Searches
+        `nodes` playouts and/or until time_ms has passed (NODES playouts if neither
+        is given, at least one either way), continuing the previous tree when the
+        position is in it."""
+        mine, theirs = (P, O) if player == 1 else (O, P)
+        if not om.legal_moves(mine, theirs):
+            return None
+        if nodes is None and time_ms is None:
+            nodes = NODES
+        t0 = time.perf_counter()
+        i = self.tree.find(P, O, player) if self.tree is not None else None
+        if i is None:
+            self.tree = SearchTree(P, O, player)
+        elif i:
+            self.tree = self.tree.subtree(i)
+        deadline = None if time_ms is None else t0 + time_ms / 1000
+        done = search(self.tree, nodes, deadline, self.puct, self.c, self.rng)
+        if stats is not None:
+            stats.nodes += done
+            stats.seconds += time.perf_counter() - t0
+        tree = self.tree
+        first, n = tree.first[0], tree.count[0]
+        best = max(range(first, first + n), key=tree.visits.__getitem__)
+        return 1 << tree.move[best]
+
+_engines: Dict[Tuple[bool, Optional[float], int], MCTS] = {}  # best_move's, one per settings and side
+
+def best_move(P: int, O: int, player: int, nodes: Optional[int] = None, time_ms: Optional[int] = None,
+              puct: bool = True, c: Optional[float] = None, stats: Optional[SearchStats] = None) -> Optional[int]:
+    """MCTS.best_move with an engine kept per (puct, c, player), so the two
+    sides of a game never share a tree."""
+    engine = _engines.get((puct, c, player))
+    if engine is None:
+        engine = _engines[puct, c, player] = MCTS(puct, c)
+    return engine.best_move(P, O, player, nodes, time_ms, stats)
@@ -0,0 +1,175 @@
+"""Table-driven pattern evaluation for the Othello bitboards (othello_man layout).
+
+The board is cut into lines and regions, and each one is read as a base-3
+number (0 empty, 1 mine, 2 theirs) that indexes a weight table shared by all
+its symmetric copies:
+
+    edge      a1-h1 plus the two X squares b2, g2     4 copies, 3**10 entries
+    corner    the 3x3 block at a1                      4 copies, 3**9
+    row2-4    a2-h2, a3-h3, a4-h4                      4 copies each, 3**8
+    diag8     a1-h8                                    2 copies, 3**8
+    diag7-4   a2-g8, a3-f8, a4-e8, a5-d8               4 copies each, 3**7 .. 3**4
+    mobility  (my moves, their moves), each capped at 31   32*32
+    potential (empties next to their discs, next to mine), capped at 31   32*32
+
+Every copy is read from the bottom-left of a flipped/mirrored/transposed
+board, so extraction is a shift and a mask. A copy read the other way round
+(right to left, or transposed for the corner) lands on a different index, so
+the fit ties each entry to its mirror (mirror_table()) to keep the evaluation
+symmetric. There is one set of tables per game stage (by disc count). Weights are int16 in 1/SCALE
+discs of final margin and are fitted from game records by othello_fit.py.
+The file is optional: load() returns None when it is missing.
+"""
+import os
+import struct
+from array import array
+from typing import List, Optional
+
+WEIGHTS_MAGIC = b"OTPW"
+WEIGHTS_HEADER = struct.Struct("<4sHHI")  # magic, version, stages, stage size
+WEIGHTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "othello_patterns.bin")
+SCALE = 32
+STAGES = 4
+
+# Table offsets within one stage
+EDGE = 0
+CORNER = EDGE + 3**10
+ROW2, ROW3, ROW4 = CORNER + 3**9, CORNER + 3**9 + 3**8, CORNER + 3**9 + 2 * 3**8
+DIAG8 = ROW4 + 3**8
+DIAG7 = DIAG8 + 3**8
+DIAG6 = DIAG7 + 3**7
+DIAG5 = DIAG6 + 3**6
+DIAG4 = DIAG5 + 3**5
+MOBILITY = DIAG4 + 3**4
+POTENTIAL = MOBILITY + 32*32
+STAGE_SIZE = POTENTIAL + 32*32
+
+# B3[bits] reads a bit pattern as base-3 digits, so index = B3[mine] + 2*B3[theirs]
+B3 = [sum(3**i for i in range(10) if bits >> i & 1) for bits in range(1 << 10)]
+REV_BYTE = bytes(int(f"{i:08b}"[::-1], 2) for i in range(256))
+DIAG_MASK = 0x8040201008040201
+# a2-g8, a3-f8, a4-e8, a5-d8 with their table offsets. A mask with one square
+# per file is gathered into a byte (by file) with one multiply.
+SHORT_DIAGS = tuple(((DIAG_MASK << 8*s) & 0xFFFFFFFFFFFFFFFF, off)
+                    for s, off in ((1, DIAG7), (2, DIAG6), (3, DIAG5), (4, DIAG4)))
+FILES = 0x0101010101010101
+ALL = 0xFFFFFFFFFFFFFFFF
+NOT_A, NOT_H = 0xFEFEFEFEFEFEFEFE, 0x7F7F7F7F7F7F7F7F
+
+def adjacent(bb: int) -> int:
+    """Squares next to any square of bb (bb itself only where two of its squares touch)."""
+    h = (bb & NOT_H) << 1 | (bb & NOT_A) >> 1
+    v = bb | h
+    return (h | v << 8 | v >> 8) & ALL
+
+def flip_v(bb: int) -> int:
+    """Mirror ranks (a1 <-> a8)."""
+    return int.from_bytes(bb.to_bytes(8, "little"), "big")
+
+def mirror_h(bb: int) -> int:
+    """Mirror files (a1 <-> h1)."""
+    return int.from_bytes(bb.to_bytes(8, "little").translate(REV_BYTE), "little")
+
+def transpose(bb: int) -> int:
+    """Flip about the a1-h8 diagonal (a2 <-> b1)."""
+    t = 0x0F0F0F0F00000000 & (bb ^ (bb << 28))
+    bb ^= t ^ (t >> 28)
+    t = 0x3333000033330000 & (bb ^ (bb << 14))
+    bb ^= t ^ (t >> 14)
+    t = 0x5500550055005500 & (bb ^ (bb << 7))
+    bb ^= t ^ (t >> 7)
+    return bb
+
+def _views(bb: int):
+    """The board seen from each corner/edge: (identity, flip_v, mirror_h, both, transpose, flip_v(transpose))."""
+    v, m, t = flip_v(bb), mirror_h(bb), transpose(bb)
+    return bb, v, m, flip_v(m), t, flip_v(t)
+
+def stage(P: int, O: int) -> int:
+    return min(STAGES - 1, ((P | O).bit_count() - 4) * STAGES // 60)
+
+def features(P: int, O: int, my_moves: int, opp_moves: int) -> List[int]:
+    """Flat weight indices of every pattern for the side owning P, given both sides' move counts."""
+    base = stage(P, O) * STAGE_SIZE
+    p0, pv, pm, pvm, pt, pvt = _views(P)
+    o0, ov, om, ovm, ot, ovt = _views(O)
+    out = []
+    for p, o in ((p0, o0), (pv, ov), (pt, ot), (pvt, ovt)):
+        pe = (p & 0xFF) | (p >> 1 & 0x100) | (p >> 5 & 0x200)
+        oe = (o & 0xFF) | (o >> 1 & 0x100) | (o >> 5 & 0x200)
+        out.append(base + EDGE + B3[pe] + 2 * B3[oe])
+        out.append(base + ROW2 + B3[p >> 8 & 0xFF] + 2 * B3[o >> 8 & 0xFF])
+        out.append(base + ROW3 + B3[p >> 16 & 0xFF] + 2 * B3[o >> 16 & 0xFF])
+        out.append(base + ROW4 + B3[p >> 24 & 0xFF] + 2 * B3[o >> 24 & 0xFF])
+    for p, o in ((p0, o0), (pm, om), (pv, ov), (pvm, ovm)):
+        pc = (p & 7) | (p >> 5 & 0x38) | (p >> 10 & 0x1C0)
+        oc = (o & 7) | (o >> 5 & 0x38) | (o >> 10 & 0x1C0)
+        out.append(base + CORNER + B3[pc] + 2 * B3[oc])
+    for p, o in ((p0, o0), (pm, om)):
+        pd = (p & DIAG_MASK) * FILES >> 56 & 0xFF
+        od = (o & DIAG_MASK) * FILES >> 56 & 0xFF
+        out.append(base + DIAG8 + B3[pd] + 2 * B3[od])
+    for p, o in ((p0, o0), (pt, ot), (pm, om), (pv, ov)):
+        for mask, off in SHORT_DIAGS:
+            pd = (p & mask) * FILES >> 56 & 0xFF
+            od = (o & mask) * FILES >> 56 & 0xFF
+            out.append(base + off + B3[pd] + 2 * B3[od])
+    out.append(base + MOBILITY + min(my_moves, 31) * 32 + min(opp_moves, 31))
+    empty = ~(P | O) & ALL
+    my_pot = (empty & adjacent(O)).bit_count()
+    opp_pot = (empty & adjacent(P)).bit_count()
+    out.append(base + POTENTIAL + min(my_pot, 31) * 32 + min(opp_pot, 31))
+    return out
+
+# --- Mirrored entries ---
+# Digit order of each table read the other way round: the edge reversed with
+# its X squares swapped, the corner transposed, lines reversed.
+MIRROR_DIGITS = ((EDGE, [7, 6, 5, 4, 3, 2, 1, 0, 9, 8]), (CORNER, [0, 3, 6, 1, 4, 7, 2, 5, 8]),
+                 (ROW2, list(range(7, -1, -1))), (ROW3, list(range(7, -1, -1))), (ROW4, list(range(7, -1, -1))),
+                 (DIAG8, list(range(7, -1, -1))), (DIAG7, list(range(6, -1, -1))), (DIAG6, list(range(5, -1, -1))),
+                 (DIAG5, list(range(4, -1, -1))), (DIAG4, list(range(3, -1, -1))))
+
+def _mirror_digits(perm: List[int]) -> List[int]:
+    """m[i] = index of i with its base-3 digits permuted (digit perm[j] moves to j)."""
+    place = [0] * len(perm)
+    for j, i in enumerate(perm):
+        place[i] = 3**j
+    m = [0]
+    for i in range(len(perm)):
+        m = [x + d * place[i] for d in range(3) for x in m]
+    return m
+
+def mirror_table() -> List[int]:
+    """Flat index -> index of its mirrored entry, over all stages (mobility and potential map to themselves)."""
+    one = list(range(STAGE_SIZE))
+    for off, perm in MIRROR_DIGITS:
+        m = _mirror_digits(perm)
+        one[off:off + len(m)] = [off + i for i in m]
+    return [s * STAGE_SIZE + i for s in range(STAGES) for i in one]
+
+def symmetric(weights: List[int]) -> bool:
+    """True if every entry equals its mirror, i.e. the evaluation is the same on all 8 board symmetries."""
+    return all(map(int.__eq__, weights, map(weights.__getitem__, mirror_table())))
+
+def evaluate(P: int, O: int, my_moves: int, opp_moves: int, weights: List[int]) -> int:
+    """Pattern score for the side owning P, in 1/SCALE discs."""
+    return sum(map(weights.__getitem__, features(P, O, my_moves, opp_moves)))
+
+def save(path: str, weights) -> None:
+    with open(path, "wb") as f:
+        f.write(WEIGHTS_HEADER.pack(WEIGHTS_MAGIC, 1, STAGES, STAGE_SIZE))
+        f.write(array("h", weights).tobytes())
+
+def load(path: str = WEIGHTS_PATH) -> Optional[List[int]]:
+    """Weights as a flat list, or None if the file is missing or was written for other tables."""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    magic, _, stages, size = WEIGHTS_HEADER.unpack_from(data)
+    if magic != WEIGHTS_MAGIC or stages != STAGES or size != STAGE_SIZE:
+        return None
+    w = array("h")
+    w.frombytes(data[WEIGHTS_HEADER.size:])
+    return w.tolist()
@@ -0,0 +1,84 @@
+"""Calibrate othello_man's ProbCut regressions from recorded Othello games.
+
+Samples midgame positions from arena.py JSONL game records, searches each one
+full-width at every depth up to --max-depth, and fits the deep score against
+the shallow one for each (depth, shallow depth) pair: deep ~ a * shallow + b,
+with sigma the residual standard deviation. The result is written to the
+section of othello_probcut.json for the evaluation in use, e.g.
+
+    python othello_probcut.py selfplay.jsonl --positions 300 --max-depth 7
+    python othello_probcut.py selfplay.jsonl --hand     # for evaluate() instead of the pattern tables
+
+Positions are searched with the root side as max_player for half of them and
+the other side for the rest, as ProbCut nodes inside the search are.
+"""
+import argparse
+import json
+import math
+import random
+import sys
+from typing import Dict, List, Tuple
+
+import othello_man as om
+from othello_fit import load_games, replay
+
+# Deep depth -> shallow depth. Two plies less: the evaluation swings between
+# odd and even depths, and a gap of 4 came out with up to twice the sigma.
+PAIRS = {d: d - 2 for d in range(3, 10)}
+
+def sample_positions(games: List[List[int]], n: int, rng: random.Random) -> List[Tuple[int, int]]:
+    """n (mine, theirs) positions before the solver takes over, where the side to move can move."""
+    pool = [(mine, theirs) for moves in games for mine, theirs, _ in replay(moves)
+            if om.popcnt(~(mine | theirs) & om.ALL) > om.ENDGAME_EMPTIES]
+    return rng.sample(pool, min(n, len(pool)))
+
+def search_values(mine: int, theirs: int, max_depth: int, max_player: int) -> List[int]:
+    """Full-width scores at depths 0..max_depth from the side to move's view."""
+    om.TT.clear()
+    return [om.alphabeta(mine, theirs, d, -math.inf, math.inf, max_player, 1)[0] for d in range(max_depth + 1)]
+
+def regress(xs: List[int], ys: List[int]) -> Tuple[float, float, float]:
+    """(a, b, sigma) of the least-squares line ys ~ a * xs + b."""
+    n = len(xs)
+    mx, my = sum(xs) / n, sum(ys) / n
+    sxx = sum((x - mx) ** 2 for x in xs)
+    sxy = sum((x - mx) * (y - my) for x, y in zip(xs, ys))
+    a = sxy / sxx if sxx else 1.0
+    b = my - a * mx
+    sigma = math.sqrt(sum((y - a * x - b) ** 2 for x, y in zip(xs, ys)) / max(1, n - 2))
+    return a, b, sigma
+
+def calibrate(values: List[List[int]], pairs: Dict[int, int]) -> Dict[int, Tuple[int, float, float, float]]:
+    out = {}
+    for d, s in sorted(pairs.items()):
+        rows = [(v[s], v[d]) for v in values if len(v) > d and abs(v[s]) < 10**7 and abs(v[d]) < 10**7]
+        if len(rows) < 10:
+            continue
+        a, b, sigma = regress([x for x, _ in rows], [y for _, y in rows])
+        out[d] = (s, round(a, 4), round(b, 2), round(sigma, 2))
+    return out
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("records", nargs="+", help="arena JSONL files")
+    ap.add_argument("--positions", type=int, default=300)
+    ap.add_argument("--max-depth", type=int, default=7)
+    ap.add_argument("--hand", action="store_true", help="calibrate evaluate() rather than the pattern tables")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--out", default=om.PROBCUT_PATH)
+    args = ap.parse_args()
+    om.use_patterns(not args.hand)
+    positions = sample_positions(load_games(args.records), args.positions, random.Random(args.seed))
+    values = []
+    for i, (mine, theirs) in enumerate(positions):
+        values.append(search_values(mine, theirs, args.max_depth, 1 + i % 2))
+        if (i + 1) % 10 == 0:
+            print(f"{i+1}/{len(positions)} positions", file=sys.stderr)
+    table = calibrate(values, {d: s for d, s in PAIRS.items() if d <= args.max_depth})
+    for d, (s, a, b, sigma) in table.items():
+        print(f"depth {d} from {s}: a {a:.3f}  b {b:.1f}  sigma {sigma:.1f}", file=sys.stderr)
+    data = {name: {str(d): list(v) for d, v in pairs.items()} for name, pairs in om.load_probcut(args.out).items()}
+    data[om.eval_name()] = {str(d): list(v) for d, v in table.items()}
+    with open(args.out, "w") as f:
+        f.write("{\n" + ",\n".join(f" {json.dumps(name)}: {json.dumps(pairs)}" for name, pairs in sorted(data.items())) + "\n}\n")
+    print(f"wrote {args.out}")
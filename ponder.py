@@ -0,0 +1,94 @@
+"""Pondering for the CLI game loops: search on the human's time.
+
+While input() waits for the human, a daemon thread runs the bot's own search
+for the positions after each human reply, most likely reply first, with the
+same depth or time budget as a real turn. The searches share the engine's
+transposition table. input() releases the GIL, so the thread runs at full
+speed. Once the human's move is known, take() returns:
+
+    - the finished result for that move, at once;
+    - the result of the search in progress, if it is that move (the search
+      keeps going until it finishes);
+    - None otherwise, after stopping the thread. The caller searches as
+      usual, with the TT the ponder searches filled.
+
+The engine must stop a search when asked: `halt(True)` makes its search raise
+at the next check, `halt(False)` re-arms it.
+
+    ponder = Ponderer(engine.halt)
+    ponder.start([(move, lambda: engine.best_move(...)) for move in replies])
+    ...input()...
+    result = ponder.take(move)
+"""
+import threading
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+class Ponderer:
+    def __init__(self, halt: Callable[[bool], None]):
+        self.halt = halt
+        self.thread: Optional[threading.Thread] = None
+        self.results: Dict[Hashable, Any] = {}
+        self.current: Optional[Hashable] = None
+        self.stopping = False
+        self.lock = threading.Lock()
+
+    def start(self, jobs: List[Tuple[Hashable, Callable[[], Any]]]):
+        """Search jobs (key, search) in order in the background."""
+        self.stop()
+        self.results, self.stopping = {}, False
+        self.thread = threading.Thread(target=self._run, args=(jobs,), daemon=True)
+        self.thread.start()
+
+    def _run(self, jobs: List[Tuple[Hashable, Callable[[], Any]]]):
+        for key, search in jobs:
+            with self.lock:
+                if self.stopping:
+                    return
+                self.current = key
+            try:
+                result = search()
+            except Exception:
+                if self.stopping:  # the engine's stop exception, or anything a halted search leaves behind
+                    return
+                raise
+            with self.lock:
+                if self.stopping:
+                    return
+                self.results[key] = result
+                self.current = None
+
+    def take(self, key: Hashable) -> Optional[Any]:
+        """The pondered result for key (waiting for it if it is being searched), or None."""
+        with self.lock:
+            if key in self.results:
+                hit = True
+            elif key == self.current:
+                hit = None  # wait for it below
+            else:
+                hit = False
+            if hit is not None:
+                self.stopping = True
+        if hit is None:
+            # Let the search for key finish, then stop before the next job
+            while self.thread.is_alive():
+                with self.lock:
+                    if key in self.results:
+                        self.stopping = True
+                        break
+                self.thread.join(0.01)
+        self.stop()
+        return self.results.get(key)
+
+    def stop(self):
+        """Abandon pondering and wait for the thread to exit."""
+        if self.thread is None:
+            return
+        with self.lock:
+            self.stopping = True
+            interrupt = self.thread.is_alive()
+        if interrupt:
+            self.halt(True)
+            self.thread.join()
+            self.halt(False)
+        self.thread = None
+        self.current = None
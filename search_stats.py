@@ -0,0 +1,63 @@
+"""Search counters shared by the Connect 4 and Othello engines.
+
+Pass a SearchStats to an engine's best_move(..., stats=s). The engine fills it
+in, and as_dict()/to_json() export it. When no stats object is given, the
+searches only pay a None check at the places that count.
+"""
+import json
+from typing import Dict, List, Optional
+
+class SearchStats:
+    __slots__ = ("nodes", "interior", "cutoffs", "first_move_cutoffs",
+                 "tt_probes", "tt_hits", "tt_stores", "tt_overwrites",
+                 "depths", "seconds")
+
+    def __init__(self):
+        self.nodes = 0               # positions visited by alphabeta
+        self.interior = 0            # of those, positions whose moves were searched
+        self.cutoffs = 0             # beta cutoffs
+        self.first_move_cutoffs = 0  # cutoffs on the first move tried
+        self.tt_probes = 0
+        self.tt_hits = 0
+        self.tt_stores = 0
+        self.tt_overwrites = 0       # stores that evicted another position
+        self.depths: List[Dict] = [] # one {"depth", "nodes", "seconds"} per completed search depth
+        self.seconds = 0.0
+
+    def add_depth(self, depth: int, nodes: int, seconds: float):
+        self.depths.append({"depth": depth, "nodes": nodes, "seconds": round(seconds, 6)})
+
+    @property
+    def cutoff_rate(self) -> float:
+        return self.cutoffs / self.interior if self.interior else 0.0
+
+    @property
+    def first_move_cutoff_rate(self) -> float:
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
+
+    @property
+    def tt_hit_rate(self) -> float:
+        return self.tt_hits / self.tt_probes if self.tt_probes else 0.0
+
+    @property
+    def ebf(self) -> Optional[float]:
+        """Effective branching factor: node growth over the last two depths when
+        there are two, else nodes ** (1/depth)."""
+        if len(self.depths) >= 2 and self.depths[-2]["nodes"]:
+            return self.depths[-1]["nodes"] / self.depths[-2]["nodes"]
+        if self.depths and self.depths[-1]["depth"] > 0 and self.depths[-1]["nodes"]:
+            return self.depths[-1]["nodes"] ** (1 / self.depths[-1]["depth"])
+        return None
+
+    @property
+    def nps(self) -> float:
+        return self.nodes / self.seconds if self.seconds else 0.0
+
+    def as_dict(self) -> Dict:
+        d = {k: getattr(self, k) for k in self.__slots__}
+        d.update(cutoff_rate=self.cutoff_rate, first_move_cutoff_rate=self.first_move_cutoff_rate,
+                 tt_hit_rate=self.tt_hit_rate, ebf=self.ebf, nps=self.nps)
+        return d
+
+    def to_json(self) -> str:
+        return json.dumps(self.as_dict())